@@ -0,0 +1,89 @@
+from sqlalchemy import Column, DateTime, Integer, String, func, insert, select, text
+from db import Base
+import logging
+from Classes.ScorecardChart import ScoreCardChart, chart_rows, chart_select
+
+# Values of ChangeLog.table_name
+SCORECARD = 'scorecard'  # row_id is a scorecard_indicators3 secondary_id
+INDICATOR = 'indicator'  # row_id is an indicators_revised id; all of its scorecard values may have changed
+ALL = 'all'  # Every row may have changed (e.g. a full re-standardization)
+
+# Beyond this many changed rows a delta is no smaller than a full reload
+MAX_DELTA_ROWS = 5000
+
+
+class ChangeLog(Base):
+    __tablename__ = 'change_log'
+    # AUTOINCREMENT so SQLite never reuses a version
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    version = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer)
+    operation = Column(String, nullable=False)  # 'upsert' or 'delete'
+    changed_at = Column(DateTime, server_default=func.now())
+
+
+def record_changes(session, table_name, row_ids=(None,), operation='upsert'):
+    """
+    Add change-log entries for ``row_ids`` in the caller's transaction.
+
+    On Postgres the table is locked until the caller commits, so versions become
+    visible in the order they were assigned and a client that has seen version N
+    has also seen every change below it.
+    """
+    row_ids = list(dict.fromkeys(row_ids))
+    if not row_ids:
+        return
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(text("LOCK TABLE change_log IN SHARE ROW EXCLUSIVE MODE"))
+    session.execute(insert(ChangeLog.__table__),
+                    [{'table_name': table_name, 'row_id': row_id, 'operation': operation} for row_id in row_ids])
+
+
+def latest_version(session):
+    return session.scalar(select(func.max(ChangeLog.__table__.c.version))) or 0
+
+
+def get_scorecard_chart_changes(since):
+    """
+    The ``/api/scorecard_chart`` rows changed after version ``since``.
+
+    Returns ``{'version', 'reset', 'rows', 'deleted'}``. ``rows`` are the current
+    rows that were inserted or updated and ``deleted`` the secondary IDs that no
+    longer exist. When ``reset`` is true, ``rows`` is the full data set and
+    replaces the client's copy: after a change to every row, a delta larger than
+    ``MAX_DELTA_ROWS``, or a ``since`` the log does not know about.
+    """
+    from db import Session
+    changes = ChangeLog.__table__
+    chart = ScoreCardChart.__table__
+    session = Session()
+    try:
+        version = latest_version(session)
+        entries = session.execute(
+            select(changes.c.table_name, changes.c.row_id, changes.c.operation)
+            .where(changes.c.version > since, changes.c.version <= version)
+        ).all()
+
+        reset = since > version or any(entry.table_name == ALL for entry in entries)
+        scorecard_ids = {entry.row_id for entry in entries if entry.table_name == SCORECARD}
+        indicator_ids = {entry.row_id for entry in entries if entry.table_name == INDICATOR}
+        if len(scorecard_ids) > MAX_DELTA_ROWS:
+            reset = True
+        if reset:
+            return {'version': version, 'reset': True, 'rows': chart_rows(session, chart_select()), 'deleted': []}
+
+        rows = []
+        if scorecard_ids or indicator_ids:
+            rows = chart_rows(session, chart_select().where(
+                chart.c.secondary_id.in_(sorted(scorecard_ids)) | chart.c.id.in_(sorted(indicator_ids))
+            ))
+        # Logged rows that are no longer there were deleted
+        deleted = sorted(scorecard_ids - {row['Secondary_ID'] for row in rows})
+        return {'version': version, 'reset': False, 'rows': rows, 'deleted': deleted}
+    except Exception as e:
+        logging.error(f"Error fetching scorecard chart changes: {e}")
+        return None
+    finally:
+        session.close()
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean
+import logging
+
+from sqlalchemy import Column, Integer, String, Text, Boolean, select
 from sqlalchemy.orm import relationship
 from db import Base  # Ensure you're importing Base from your centralized module
 
@@ -41,13 +43,53 @@ class Indicator(Base):
     scorecard_values = relationship('ScoreCardIndicator2', back_populates='indicator_details', cascade='all, delete-orphan')
 
 # Fetching the data from the database
-def get_all_indicators():
+def iter_indicators(batch_size=500):
+    """
+    Yield indicator dicts one at a time, each with its scorecard values.
+
+    Indicators and values are read as two id-ordered Core result streams and
+    merged as they go, so the first indicator is available before the last value
+    is fetched and no per-indicator relationship query is issued. The session is
+    closed when the generator is exhausted or closed.
+    """
     from db import Session  # Import Session here to avoid circular import issues
+    from Classes.ScorecardValues import ScoreCardIndicator2
+    from shared_snapshot import shared_snapshot
     session = Session()
     try:
-        indicators = session.query(Indicator).all()
-        return [
-            {
+        indicator_table = Indicator.__table__
+        scorecard_table = ScoreCardIndicator2.__table__
+        snapshot = shared_snapshot.current()
+        if snapshot is not None:
+            # Same two id-ordered streams, read from the shared snapshot
+            indicator_rows = snapshot.table(indicator_table.name)
+            scorecard_rows = snapshot.table(scorecard_table.name)
+            indicators = indicator_rows.fetch(indicator_rows.select(order_by=['id']))
+            scorecards = iter(scorecard_rows.fetch(
+                scorecard_rows.select(order_by=['id', 'secondary_id'], not_null=['id'])
+            ))
+        else:
+            indicators = session.execute(
+                select(indicator_table).order_by(indicator_table.c.id).execution_options(yield_per=batch_size)
+            )
+            scorecards = iter(session.execute(
+                select(scorecard_table)
+                .where(scorecard_table.c.id.isnot(None))
+                .order_by(scorecard_table.c.id, scorecard_table.c.secondary_id)
+                .execution_options(yield_per=batch_size)
+            ))
+        pending = next(scorecards, None)
+
+        for indicator in indicators:
+            # Skip values whose indicator no longer exists, then collect this one's
+            while pending is not None and pending.id < indicator.id:
+                pending = next(scorecards, None)
+            values = []
+            while pending is not None and pending.id == indicator.id:
+                values.append(pending)
+                pending = next(scorecards, None)
+
+            yield {
                 'ID': indicator.id,
                 'IndicatorID': indicator.indicator_id,
                 'API_url': indicator.api_url,
@@ -90,12 +132,16 @@ def get_all_indicators():
                         'Value_N': scorecard.value_n,
                         'Value_Standardized': scorecard.value_standardized,
                         'Positive': scorecard.positive,
-                    } for scorecard in indicator.scorecard_values
+                    } for scorecard in values
                 ]
-            } for indicator in indicators
-        ]
-    except Exception as e:
-        print(f"Error fetching indicators: {e}")
-        return None
+            }
     finally:
         session.close()  # Ensuring the session is closed after the operation
+
+
+def get_all_indicators():
+    try:
+        return list(iter_indicators())
+    except Exception as e:
+        logging.error(f"Error fetching indicators: {e}")
+        return None
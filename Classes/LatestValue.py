@@ -0,0 +1,119 @@
+import logging
+import re
+
+from sqlalchemy import Boolean, Column, Float, Index, Integer, String, delete, insert, select
+from db import Base
+from Classes.ScorecardValues import SCORECARD_FIELDS, ScoreCardIndicator2
+
+# Columns copied from the chosen scorecard_indicators3 row
+VALUE_COLUMNS = [
+    'secondary_id', 'category_id', 'group_name', 'indicator', 'proxy', 'year', 'source', 'value', 'value_n',
+    'value_map', 'value_standardized', 'positive', 'value_standardized_table', 'percent_number',
+]
+KEY_COLUMNS = ['id', 'country', 'year_type']
+
+
+class LatestValue(Base):
+    """
+    The most recent value of each indicator per country and year type.
+
+    Materialized from ``scorecard_indicators3``, whose years are strings, and
+    kept current by ``refresh_latest_values()`` in the transaction of every save.
+    """
+    __tablename__ = 'latest_values'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # indicators_revised.id
+    country = Column(String, primary_key=True)
+    year_type = Column(Integer, primary_key=True, autoincrement=False)
+    year_rank = Column(Integer)  # Numeric form of ``year`` that picked this row
+    secondary_id = Column(Integer, nullable=False)
+    category_id = Column(Integer)
+    group_name = Column(String)
+    indicator = Column(String)
+    proxy = Column(String)
+    year = Column(String)
+    source = Column(String)
+    value = Column(String)
+    value_n = Column(String)
+    value_map = Column(String)
+    value_standardized = Column(Float)
+    positive = Column(Boolean)
+    value_standardized_table = Column(Float)
+    percent_number = Column(Boolean)
+
+    __table_args__ = (
+        Index('ix_latest_values_country_year_type', 'country', 'year_type'),
+        Index('ix_latest_values_group', 'group_name', 'country', 'year_type'),
+    )
+
+
+def year_rank(year):
+    """Sortable form of a stored year such as '2021' or '2019-20' (the last four-digit year); -1 if none."""
+    years = re.findall(r'\d{4}', year or '')
+    return int(years[-1]) if years else -1
+
+
+def refresh_latest_values(session, indicator_ids=None):
+    """
+    Recompute the latest values of ``indicator_ids`` (every indicator when ``None``) in the caller's transaction.
+
+    A row is a candidate when it has an indicator, country, year type and a
+    non-empty value. The latest is the one with the highest ``year_rank()``, and
+    the highest ``secondary_id`` among equal years. Returns the rows written.
+    """
+    if indicator_ids is not None:
+        indicator_ids = sorted({indicator_id for indicator_id in indicator_ids if indicator_id is not None})
+        if not indicator_ids:
+            return 0
+    scorecards = ScoreCardIndicator2.__table__
+    latest = LatestValue.__table__
+
+    query = select(*(scorecards.c[column] for column in KEY_COLUMNS + VALUE_COLUMNS)).where(
+        scorecards.c.id.isnot(None), scorecards.c.country.isnot(None), scorecards.c.year_type.isnot(None),
+        scorecards.c.value.isnot(None), scorecards.c.value != '',
+    )
+    if indicator_ids is not None:
+        query = query.where(scorecards.c.id.in_(indicator_ids))
+
+    chosen = {}
+    for row in session.execute(query):
+        values = row._asdict()
+        values['year_rank'] = year_rank(row.year)
+        key = (row.id, row.country, row.year_type)
+        current = chosen.get(key)
+        if current is None or (values['year_rank'], row.secondary_id) > (current['year_rank'], current['secondary_id']):
+            chosen[key] = values
+
+    clear = delete(latest)
+    if indicator_ids is not None:
+        clear = clear.where(latest.c.id.in_(indicator_ids))
+    session.execute(clear)
+    rows = list(chosen.values())
+    for start in range(0, len(rows), 500):
+        session.execute(insert(latest), rows[start:start + 500])
+    return len(rows)
+
+
+def get_latest_values(group_name=None, country=None, year_type=None, indicator_id=None):
+    """Latest value rows, keyed like ``/api/scorecard_indicators``, optionally filtered."""
+    from db import Session
+    latest = LatestValue.__table__
+    output_fields = [key for key, column in SCORECARD_FIELDS.items() if column in latest.c]
+    statement = select(*(latest.c[SCORECARD_FIELDS[key]] for key in output_fields))
+    if group_name is not None:
+        statement = statement.where(latest.c.group_name == group_name)
+    if country is not None:
+        statement = statement.where(latest.c.country == country)
+    if year_type is not None:
+        statement = statement.where(latest.c.year_type == year_type)
+    if indicator_id is not None:
+        statement = statement.where(latest.c.id == indicator_id)
+
+    session = Session()
+    try:
+        return [dict(zip(output_fields, row)) for row in session.execute(statement.order_by(*latest.primary_key))]
+    except Exception as e:
+        logging.error(f"Error fetching latest values: {e}")
+        return None
+    finally:
+        session.close()
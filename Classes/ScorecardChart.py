@@ -1,64 +1,102 @@
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Boolean, Float
-from sqlalchemy.orm import scoped_session
-from db import Session
+from sqlalchemy import select
+from db import Base, Session
 import logging
+from Classes.ScorecardValues import ScoreCardIndicator2
+from serialization import to_columnar
 
-Base = declarative_base()
 
 class ScoreCardChart(Base):
-    __tablename__ = 'scorecard_indicators3'
-
-    id = Column(Integer)  # Unique identifier for each indicator
-    category_id = Column(Integer)  # Maps to group_name using provided mapping
-    secondary_id = Column(Integer, primary_key=True)  # Unique identifier for each value
-    group_name = Column(String)
-    indicator = Column(String)
-    proxy = Column(String)
-    country = Column(String)
-    year = Column(String)  # Changed to String
-    year_type = Column(Integer)
-    source = Column(String)
-    value = Column(String)  # Changed to String
-    value_n = Column(String)  # Changed to String
-    value_map = Column(String)
-    value_standardized = Column(Float)
-    positive = Column(Boolean)
-    value_standardized_table = Column(Float)
-    percent_number = Column(Boolean)  # New column added
+    # The chart's read-only mapping of scorecard_indicators3, on the same table (and metadata) as ScoreCardIndicator2
+    __table__ = ScoreCardIndicator2.__table__
 
 # Setting up logging
 logging.basicConfig(level=logging.ERROR)
 
-# Fetch scoreCard_indicators2 data
-def get_scorecard_chart_data():
+# Output key -> column, in response order
+CHART_FIELDS = {
+    'ID': 'id',
+    'Category_ID': 'category_id',
+    'Secondary_ID': 'secondary_id',
+    'Group_Name': 'group_name',
+    'Indicator': 'indicator',
+    'Proxy': 'proxy',
+    'Country': 'country',
+    'Year': 'year',
+    'Year_Type': 'year_type',
+    'Source': 'source',
+    'Value': 'value',
+    'Value_N': 'value_n',
+    'Value_Map': 'value_map',
+    'Value_Standardized': 'value_standardized',
+    'Positive': 'positive',
+    'Value_Standardized_Table': 'value_standardized_table',
+    'Percent_Number': 'percent_number',
+}
+
+
+def chart_rows(session, statement):
+    """Run a ``chart_select()`` statement and return the rows as chart dicts."""
+    keys = tuple(CHART_FIELDS)
+    return [dict(zip(keys, row)) for row in session.execute(statement)]
+
+
+def chart_select():
+    # Core select: plain row tuples, no ORM instances or identity-map tracking
+    table = ScoreCardChart.__table__
+    return select(*(table.c[column] for column in CHART_FIELDS.values()))
+
+
+# Fetch scoreCard_indicators2 data, from ``snapshot`` (a mapped shared snapshot) when one is given
+def get_scorecard_chart_data(snapshot=None):
+    if snapshot is not None:
+        keys = tuple(CHART_FIELDS)
+        table = snapshot.table(ScoreCardChart.__table__.name)
+        return [dict(zip(keys, row)) for row in table.fetch(columns=list(CHART_FIELDS.values()))]
+
     session = Session()
     try:
-        indicators = session.query(ScoreCardChart).all()
-        print(len(indicators))
-        return [
-            {
-                'ID': indicator.id,
-                'Category_ID': indicator.category_id,
-                'Secondary_ID': indicator.secondary_id,
-                'Group_Name': indicator.group_name,
-                'Indicator': indicator.indicator,
-                'Proxy': indicator.proxy,
-                'Country': indicator.country,
-                'Year': indicator.year,
-                'Year_Type': indicator.year_type,
-                'Source': indicator.source,
-                'Value': indicator.value,
-                'Value_N': indicator.value_n,
-                'Value_Map': indicator.value_map,
-                'Value_Standardized': indicator.value_standardized,
-                'Positive': indicator.positive,
-                'Value_Standardized_Table': indicator.value_standardized_table,
-                'Percent_Number': indicator.percent_number  # New field added
-            } for indicator in indicators
-        ]
+        return chart_rows(session, chart_select())
     except Exception as e:
         logging.error(f"Error fetching indicators: {e}")
         return None
     finally:
         session.close()  # Ensuring the session is closed after the operation
+
+
+def group_scorecard_chart_data(rows, columnar=False):
+    """
+    Arrange chart rows the way the dashboard's ``globalData`` needs them.
+
+    Returns ``globalData`` (Group_Name -> Country -> Year_Type -> rows, leaving out
+    rows without a Value_Standardized), ``countryYearTypes`` (each country's year
+    types in first-seen order) and the sorted ``allIndicators``. With
+    ``columnar``, the kept rows are sent once as a ``to_columnar()`` payload in
+    ``rows`` and ``globalData`` holds their indices, so every key and repeated
+    string is not sent again in each row.
+    """
+    grouped = {}
+    kept = []
+    country_year_types = {}
+    indicators = set()
+    for row in rows:
+        year_types = grouped.setdefault(row['Group_Name'], {}).setdefault(row['Country'], {})
+        values = year_types.setdefault(row['Year_Type'], [])
+        standardized = row['Value_Standardized']
+        if standardized is not None and standardized == standardized:  # NaN != NaN
+            values.append(len(kept) if columnar else row)
+            kept.append(row)
+        country_year_types.setdefault(row['Country'], {})[row['Year_Type']] = None
+        indicators.add(row['Indicator'])
+    result = {
+        'globalData': grouped,
+        'countryYearTypes': {country: list(year_types) for country, year_types in country_year_types.items()},
+        'allIndicators': sorted(indicators, key=lambda name: (name is None, name or '')),
+    }
+    if columnar:
+        result['rows'] = to_columnar(kept)
+    return result
+
+
+def get_scorecard_chart_grouped(snapshot=None, columnar=False):
+    rows = get_scorecard_chart_data(snapshot)
+    return group_scorecard_chart_data(rows, columnar) if rows else rows
@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey
-from sqlalchemy.orm import relationship, joinedload
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, Index, select
+from sqlalchemy.orm import relationship
 from db import Base  # Import Base from your centralized module
 import logging
-import json
 from Classes.Indicator import Indicator  # Ensure correct import path
+from shared_snapshot import shared_snapshot
 
 class ScoreCardIndicator2(Base):
     __tablename__ = 'scorecard_indicators3'
@@ -29,83 +29,183 @@ class ScoreCardIndicator2(Base):
     # Define the relationship to the Indicator table
     indicator_details = relationship('Indicator', back_populates='scorecard_values')
 
-# Fetching the data from the database with joinedload
-def get_scorecard_indicator2_data():
+    # Composite indexes for the filtered, keyset-paginated reads (secondary_id last
+    # so each filter can be followed by an ordered range scan)
+    __table_args__ = (
+        Index('ix_scorecard3_group_country_year_type', 'group_name', 'country', 'year_type', 'secondary_id'),
+        Index('ix_scorecard3_indicator_year_type', 'id', 'year_type', 'secondary_id'),
+        Index('ix_scorecard3_category', 'category_id', 'secondary_id'),
+    )
+
+
+# Output key -> model column, used for field projection
+SCORECARD_FIELDS = {
+    'ID': 'id',
+    'Category_ID': 'category_id',
+    'Secondary_ID': 'secondary_id',
+    'Group_Name': 'group_name',
+    'Indicator_Name': 'indicator',
+    'Proxy': 'proxy',
+    'Country': 'country',
+    'Year': 'year',
+    'Year_Type': 'year_type',
+    'Source': 'source',
+    'Value': 'value',
+    'Value_N': 'value_n',
+    'Value_Map': 'value_map',
+    'Value_Standardized': 'value_standardized',
+    'Positive': 'positive',
+    'Value_Standardized_Table': 'value_standardized_table',
+    'Percent_Number': 'percent_number',
+}
+
+MAX_PAGE_SIZE = 5000
+
+
+def indicator_details(indicator):
+    """The ``Indicator_Details`` block served alongside scorecard values."""
+    return {
+        'IndicatorID': indicator.indicator_id,
+        'API_url': indicator.api_url,
+        'Category': indicator.category,
+        'CategoryID': indicator.category_id,
+        'Dataset': indicator.dataset,
+        'Proxy': indicator.proxy,
+        'Source': indicator.source,
+        'IndicatorCode': indicator.indicator_code,
+        'IndicatorName': indicator.indicator_name,
+        'Positive_Negative_Indicator': indicator.positive_negative_indicator,
+        'Number_Percent': indicator.number_percent,
+        'Notes': indicator.notes,
+        'Years': {
+            'AFG': indicator.afghanistan_year,
+            'BAN': indicator.bangladesh_year,
+            'IND': indicator.india_year,
+            'MLD': indicator.maldives_year,
+            'NEP': indicator.nepal_year,
+            'PAK': indicator.pakistan_year,
+            'LAK': indicator.sri_lanka_year,
+        },
+        'Year_Types': {
+            'AFG': indicator.afghanistan_year_type,
+            'BAN': indicator.bangladesh_year_type,
+            'IND': indicator.india_year_type,
+            'MLD': indicator.maldives_year_type,
+            'NEP': indicator.nepal_year_type,
+            'PAK': indicator.pakistan_year_type,
+            'LAK': indicator.sri_lanka_year_type,
+        }
+    }
+
+
+def _output_fields(fields, allow_details=True):
+    allowed = set(SCORECARD_FIELDS) | ({'Indicator_Details'} if allow_details else set())
+    if fields is None:
+        return list(SCORECARD_FIELDS) + (['Indicator_Details'] if allow_details else [])
+    unknown = set(fields) - allowed
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return list(fields)
+
+
+def _scorecard_select(columns, group_name=None, country=None, year_type=None, category_id=None,
+                      indicator_id=None, after=None, limit=None, with_indicator_id=False):
+    """
+    Filtered, optionally keyset-paginated Core select of ``columns``.
+
+    ``with_indicator_id`` appends the indicator id as a final, separately labelled
+    column so it is available even when ``ID`` was not requested.
+    """
+    table = ScoreCardIndicator2.__table__
+    selected = [table.c[name] for name in columns]
+    if with_indicator_id:
+        selected.append(table.c.id.label('indicator_ref'))
+    statement = select(*selected)
+    if group_name is not None:
+        statement = statement.where(table.c.group_name == group_name)
+    if country is not None:
+        statement = statement.where(table.c.country == country)
+    if year_type is not None:
+        statement = statement.where(table.c.year_type == year_type)
+    if category_id is not None:
+        statement = statement.where(table.c.category_id == category_id)
+    if indicator_id is not None:
+        statement = statement.where(table.c.id == indicator_id)
+    if after is not None:
+        statement = statement.where(table.c.secondary_id > after)
+    if after is not None or limit is not None:
+        statement = statement.order_by(table.c.secondary_id)
+    if limit is not None:
+        statement = statement.limit(min(limit, MAX_PAGE_SIZE))
+    return statement
+
+
+def _scorecard_rows(session, columns, group_name=None, country=None, year_type=None, category_id=None,
+                    indicator_id=None, after=None, limit=None, with_indicator_id=False):
+    """Rows of ``_scorecard_select()``, read from the shared snapshot when one is mapped."""
+    snapshot = shared_snapshot.current()
+    if snapshot is None:
+        return session.execute(_scorecard_select(
+            columns, group_name=group_name, country=country, year_type=year_type, category_id=category_id,
+            indicator_id=indicator_id, after=after, limit=limit, with_indicator_id=with_indicator_id,
+        )).all()
+
+    table = snapshot.table(ScoreCardIndicator2.__tablename__)
+    indices = table.select(
+        after=after,
+        order_by=['secondary_id'],
+        limit=min(limit, MAX_PAGE_SIZE) if limit is not None else None,
+        group_name=group_name, country=country, year_type=year_type, category_id=category_id, id=indicator_id,
+    )
+    return table.fetch(indices, list(columns) + (['id'] if with_indicator_id else []))
+
+
+def _indicator_details_by_id(session, indicator_ids):
+    """One query for the details of every referenced indicator."""
+    if not indicator_ids:
+        return {}
+    snapshot = shared_snapshot.current()
+    if snapshot is not None:
+        table = snapshot.table(Indicator.__tablename__)
+        rows = table.fetch(table.select(one_of=('id', indicator_ids)))
+    else:
+        table = Indicator.__table__
+        rows = session.execute(select(table).where(table.c.id.in_(indicator_ids)))
+    return {row.id: indicator_details(row) for row in rows}
+
+
+def get_scorecard_indicator2_data(fields=None, **filters):
+    """
+    Fetch scorecard rows with their indicator details.
+
+    Filters (``group_name``, ``country``, ``year_type``, ``category_id``,
+    ``indicator_id``) are optional and combined with AND. ``fields`` restricts the
+    output to the given keys (``Indicator_Details`` included); ``after``/``limit``
+    page through the rows ordered by ``secondary_id``.
+    """
     from db import Session  # Import Session to avoid circular import issues
 
+    output_fields = _output_fields(fields)
+    include_details = 'Indicator_Details' in output_fields
+    value_fields = [key for key in output_fields if key != 'Indicator_Details']
+
     session = Session()
     try:
-        # Use joinedload to optimize fetching related Indicator data
-        scorecards = session.query(ScoreCardIndicator2).options(joinedload(ScoreCardIndicator2.indicator_details)).all()
-        result = []
+        # Core selects return plain tuples: no ORM instances to hydrate and track.
+        # The indicator id is selected last so it can be split off for the details.
+        columns = [SCORECARD_FIELDS[key] for key in value_fields]
+        rows = _scorecard_rows(session, columns, with_indicator_id=include_details, **filters)
 
-        for scorecard in scorecards:
-            indicator_data = None
-            if scorecard.indicator_details:
-                indicator_data = {
-                    'IndicatorID': scorecard.indicator_details.indicator_id,
-                    'API_url': scorecard.indicator_details.api_url,
-                    'Category': scorecard.indicator_details.category,
-                    'CategoryID': scorecard.indicator_details.category_id,
-                    'Dataset': scorecard.indicator_details.dataset,
-                    'Proxy': scorecard.indicator_details.proxy,
-                    'Source': scorecard.indicator_details.source,
-                    'IndicatorCode': scorecard.indicator_details.indicator_code,
-                    'IndicatorName': scorecard.indicator_details.indicator_name,
-                    'Positive_Negative_Indicator': scorecard.indicator_details.positive_negative_indicator,
-                    'Number_Percent': scorecard.indicator_details.number_percent,
-                    'Notes': scorecard.indicator_details.notes,
-                    'Years': {
-                        'AFG': scorecard.indicator_details.afghanistan_year,
-                        'BAN': scorecard.indicator_details.bangladesh_year,
-                        'IND': scorecard.indicator_details.india_year,
-                        'MLD': scorecard.indicator_details.maldives_year,
-                        'NEP': scorecard.indicator_details.nepal_year,
-                        'PAK': scorecard.indicator_details.pakistan_year,
-                        'LAK': scorecard.indicator_details.sri_lanka_year,
-                    },
-                    'Year_Types': {
-                        'AFG': scorecard.indicator_details.afghanistan_year_type,
-                        'BAN': scorecard.indicator_details.bangladesh_year_type,
-                        'IND': scorecard.indicator_details.india_year_type,
-                        'MLD': scorecard.indicator_details.maldives_year_type,
-                        'NEP': scorecard.indicator_details.nepal_year_type,
-                        'PAK': scorecard.indicator_details.pakistan_year_type,
-                        'LAK': scorecard.indicator_details.sri_lanka_year_type,
-                    }
-                }
-
-            scorecard_data = {
-                'ID': scorecard.id,
-                'Category_ID': scorecard.category_id,
-                'Secondary_ID': scorecard.secondary_id,
-                'Group_Name': scorecard.group_name,
-                'Indicator_Name': scorecard.indicator,  # Match model attribute name
-                'Proxy': scorecard.proxy,
-                'Country': scorecard.country,
-                'Year': scorecard.year,
-                'Year_Type': scorecard.year_type,
-                'Source': scorecard.source,
-                'Value': scorecard.value,
-                'Value_N': scorecard.value_n,
-                'Value_Map': scorecard.value_map,
-                'Value_Standardized': scorecard.value_standardized,
-                'Positive': scorecard.positive,
-                'Value_Standardized_Table': scorecard.value_standardized_table,
-                'Percent_Number': scorecard.percent_number,
-                'Indicator_Details': indicator_data
-            }
+        if not include_details:
+            return [dict(zip(value_fields, row)) for row in rows]
 
+        # Each indicator's details are built once and shared by all of its rows
+        details = _indicator_details_by_id(session, {row[-1] for row in rows if row[-1] is not None})
+        result = []
+        for row in rows:
+            scorecard_data = dict(zip(value_fields, row))
+            scorecard_data['Indicator_Details'] = details.get(row[-1])
             result.append(scorecard_data)
-
-        # Debugging: Check for serialization issues
-        for idx, item in enumerate(result):
-            try:
-                json.dumps(item)
-            except TypeError as te:
-                logging.error(f"Serialization issue at item {idx}: {te}")
-                raise  # Reraise for visibility
-
         return result
 
     except Exception as e:
@@ -113,3 +213,34 @@ def get_scorecard_indicator2_data():
         return None
     finally:
         session.close()  # Ensuring the session is closed after the operation
+
+
+def get_scorecard_indicator2_normalized(fields=None, **filters):
+    """
+    Fetch scorecard rows with indicator metadata sent once instead of per row.
+
+    Returns ``{'indicators': {ID: details}, 'values': [...]}`` where each value's
+    ``ID`` keys into ``indicators``. Uses one query per table rather than a joined
+    load, so each indicator is built once however many rows reference it.
+    Accepts the same filters as ``get_scorecard_indicator2_data()``.
+    """
+    from db import Session  # Import Session to avoid circular import issues
+
+    output_fields = _output_fields(fields, allow_details=False)
+    if 'ID' not in output_fields:
+        output_fields.append('ID')
+
+    session = Session()
+    try:
+        columns = [SCORECARD_FIELDS[key] for key in output_fields]
+        values = [dict(zip(output_fields, row)) for row in _scorecard_rows(session, columns, **filters)]
+        indicators = _indicator_details_by_id(
+            session, {value['ID'] for value in values if value['ID'] is not None}
+        )
+        return {'indicators': indicators, 'values': values}
+
+    except Exception as e:
+        logging.error(f"Error fetching normalized scorecard indicators: {e}")
+        return None
+    finally:
+        session.close()  # Ensuring the session is closed after the operation
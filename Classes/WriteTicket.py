@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Float, Integer, String, Text
+from db import Base
+
+
+class WriteTicket(Base):
+    """Outcome of a write-behind save, so any worker can answer a status poll."""
+    __tablename__ = 'write_tickets'
+
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)  # 'saved' or 'failed'
+    error = Column(Text)
+    secondary_id = Column(Integer)  # Assigned to a new scorecard row
+    completed_at = Column(Float, index=True)  # Unix time, for pruning
@@ -0,0 +1,163 @@
+import threading
+import time
+import warnings
+
+import numpy as np
+from sqlalchemy import select
+
+import config
+from cache import snapshot_cache
+from Classes.LatestValue import LatestValue
+from db import Session
+from rankings import REGIONAL_AGGREGATES
+from standardization import parse_numeric
+
+# Region -> country left out of it; each region covers every country row but its exclusion
+REGIONS = {'South Asia Region': None, 'SARw/oIndia': 'India'}
+PERCENTILES = (10, 25, 75, 90)
+# Metric -> how to read it from a latest_values row
+METRICS = {
+    'value': lambda row: parse_numeric(row.value_n if row.value_n not in (None, '') else row.value),
+    'standardized': lambda row: np.nan if row.value_standardized is None else row.value_standardized,
+}
+
+
+def build_matrix(rows, metric):
+    """
+    Arrange ``rows`` as a ``(indicator, year type) x country`` array of ``metric``.
+
+    Returns ``(keys, countries, matrix)``, where ``keys`` are the ``(indicator id,
+    indicator name, year type)`` of each row of ``matrix`` and cells without a
+    value are NaN. Regional aggregate rows are left out; the regions are computed
+    from the countries.
+    """
+    read = METRICS[metric]
+    rows = [row for row in rows if row.country not in REGIONAL_AGGREGATES]
+    countries = sorted({row.country for row in rows})
+    keys = sorted({(row.id, row.indicator, row.year_type) for row in rows}, key=lambda key: (key[0], key[2]))
+    key_index = {(key[0], key[2]): index for index, key in enumerate(keys)}
+    country_index = {country: index for index, country in enumerate(countries)}
+
+    matrix = np.full((len(keys), len(countries)), np.nan)
+    if rows:
+        matrix[[key_index[(row.id, row.year_type)] for row in rows],
+               [country_index[row.country] for row in rows]] = [read(row) for row in rows]
+    return keys, countries, matrix
+
+
+def regional_statistics(matrix, included):
+    """
+    Statistics of each row of ``matrix`` over the ``included`` columns, in one pass per statistic.
+
+    Returns arrays keyed by statistic name, plus ``distance``: each cell's
+    difference from its row's regional mean (NaN outside the region).
+    """
+    region = np.where(included, matrix, np.nan)
+    with warnings.catch_warnings():
+        # Rows without any value in the region give NaN, which is what we want
+        warnings.simplefilter('ignore', RuntimeWarning)
+        statistics = {
+            'count': np.count_nonzero(~np.isnan(region), axis=1),
+            'mean': np.nanmean(region, axis=1),
+            'median': np.nanmedian(region, axis=1),
+            'min': np.nanmin(region, axis=1),
+            'max': np.nanmax(region, axis=1),
+        }
+        for percentile, values in zip(PERCENTILES, np.nanpercentile(region, PERCENTILES, axis=1)):
+            statistics[f'p{percentile}'] = values
+    statistics['distance'] = region - statistics['mean'][:, np.newaxis]
+    return statistics
+
+
+def _number(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def compute_aggregates(rows, metric='value'):
+    """
+    Regional statistics of ``metric`` per indicator and year type, for every region in ``REGIONS``.
+
+    Returns ``{indicator id: {'indicator': name, 'yearTypes': {year type: {region:
+    {'count', 'mean', 'median', 'min', 'max', 'p10', ..., 'distanceFromMean':
+    {country: difference}}}}}}``.
+    """
+    keys, countries, matrix = build_matrix(rows, metric)
+    if not matrix.size:
+        return {}
+    by_region = {
+        region: regional_statistics(matrix, np.array([country != excluded for country in countries]))
+        for region, excluded in REGIONS.items()
+    }
+
+    result = {}
+    for index, (indicator_id, indicator, year_type) in enumerate(keys):
+        entry = result.setdefault(indicator_id, {'indicator': indicator, 'yearTypes': {}})
+        regions = entry['yearTypes'][year_type] = {}
+        for region, statistics in by_region.items():
+            summary = {'count': int(statistics['count'][index])}
+            summary.update({name: _number(values[index]) for name, values in statistics.items()
+                            if name not in ('count', 'distance')})
+            distances = statistics['distance'][index]
+            summary['distanceFromMean'] = {country: _number(distances[column])
+                                           for column, country in enumerate(countries)
+                                           if not np.isnan(distances[column])}
+            regions[region] = summary
+    return result
+
+
+class AggregateStore:
+    """
+    Regional aggregates, computed once per data version.
+
+    The latest value of every indicator, country and year type is loaded from
+    ``latest_values`` and aggregated for all indicators at once. Any save bumps
+    ``snapshot_cache.version``, and the next read reloads. Other gunicorn
+    workers also reload at most ``ttl_seconds`` after their previous load.
+    """
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._rows = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._by_metric = {}
+        self._lock = threading.Lock()
+
+    def get(self, metric='value', indicator_id=None, year_type=None):
+        """Return ``compute_aggregates()`` for ``metric``, optionally for one indicator and/or year type."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'")
+        with self._lock:
+            version = snapshot_cache.version
+            if self._rows is None or self._version != version or time.monotonic() - self._loaded_at >= self.ttl_seconds:
+                self._load(version)
+            if metric not in self._by_metric:
+                self._by_metric[metric] = compute_aggregates(self._rows, metric)
+            aggregates = self._by_metric[metric]
+
+        if indicator_id is not None:
+            aggregates = {indicator_id: aggregates[indicator_id]} if indicator_id in aggregates else {}
+        if year_type is None:
+            return aggregates
+        filtered = {}
+        for key, entry in aggregates.items():
+            if year_type in entry['yearTypes']:
+                filtered[key] = {'indicator': entry['indicator'], 'yearTypes': {year_type: entry['yearTypes'][year_type]}}
+        return filtered
+
+    def _load(self, version):
+        table = LatestValue.__table__
+        session = Session()
+        try:
+            self._rows = session.execute(select(
+                table.c.id, table.c.indicator, table.c.country, table.c.year_type,
+                table.c.value, table.c.value_n, table.c.value_standardized,
+            )).all()
+        finally:
+            session.close()
+        self._version = version
+        self._loaded_at = time.monotonic()
+        self._by_metric = {}
+
+
+aggregate_store = AggregateStore(config.CACHE_TTL_SECONDS)
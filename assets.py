@@ -0,0 +1,292 @@
+"""
+Build step and serving helpers for fingerprinted static assets.
+
+``python assets.py`` reads ``static/`` and writes ``static/dist/``:
+
+* JS and CSS minified (with rjsmin/rcssmin when installed, otherwise a
+  conservative built-in pass that only drops comments and indentation);
+* every file renamed to ``name.<content hash>.ext``, so it can be cached forever;
+* ``.gz`` and, when the ``brotli`` package is installed, ``.br`` variants of
+  text assets;
+* with Pillow installed, resized WebP and JPEG variants of each image at
+  ``IMAGE_WIDTHS``;
+* ``manifest.json`` mapping each source path to its outputs.
+
+Run it before deploying. ``asset_url()`` resolves names through the manifest
+(falling back to the plain ``static`` URL when there is none, e.g. in
+development) and ``send_asset()`` serves the best encoding the client accepts
+with ``immutable`` cache headers.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+from io import BytesIO
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are built without it
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # Optional: images are fingerprinted but not resized without it
+    Image = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+TEXT_EXTENSIONS = ('.js', '.css', '.svg', '.json')
+IMAGE_EXTENSIONS = ('.jpeg', '.jpg', '.png')
+# Region maps are shown 60px wide; these cover 2x and 4x displays and larger uses
+IMAGE_WIDTHS = (120, 240, 480)
+IMAGE_QUALITY = 80
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _scan(source, regex_allowed_after='(,=:[!&|?{};+-*%<>~^'):
+    """
+    Split JavaScript into ``(kind, text)`` tokens: 'code', 'string' (quoted,
+    template and regex literals) and 'comment', so code can be rewritten
+    without touching literals.
+    """
+    tokens = []
+    code_start = index = 0
+    length = len(source)
+    last_significant = ''
+
+    def flush_code(end):
+        if end > code_start:
+            tokens.append(('code', source[code_start:end]))
+
+    while index < length:
+        char = source[index]
+        pair = source[index:index + 2]
+        if pair in ('//', '/*'):
+            flush_code(index)
+            end = source.find('\n' if pair == '//' else '*/', index + 2)
+            end = length if end == -1 else (end if pair == '//' else end + 2)
+            tokens.append(('comment', source[index:end]))
+            index = code_start = end
+            continue
+        is_regex = char == '/' and (not last_significant or last_significant in regex_allowed_after)
+        if char in '\'"`' or is_regex:
+            flush_code(index)
+            end = index + 1
+            in_class = False
+            while end < length:
+                current = source[end]
+                if current == '\\':
+                    end += 2
+                    continue
+                if is_regex and current == '[':
+                    in_class = True
+                elif is_regex and current == ']':
+                    in_class = False
+                elif current == char and not in_class:
+                    break
+                elif current == '\n' and char != '`':
+                    break  # Unterminated: not a literal after all
+                end += 1
+            end = min(end + 1, length)
+            tokens.append(('string', source[index:end]))
+            last_significant = ')'  # A literal is an operand
+            index = code_start = end
+            continue
+        if not char.isspace():
+            last_significant = char
+        index += 1
+    flush_code(length)
+    return tokens
+
+
+def minify_js(source):
+    """Drop comments, indentation and blank lines; line breaks are kept so ASI is unaffected."""
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    # Comments become whitespace; adjacent code is merged so only code is rewritten, never literals
+    pieces = []
+    for kind, text in _scan(source):
+        if kind == 'comment':
+            kind, text = 'code', '\n' if text.startswith('//') or '\n' in text else ' '
+        if kind == 'code' and pieces and pieces[-1][0] == 'code':
+            pieces[-1] = ('code', pieces[-1][1] + text)
+        else:
+            pieces.append((kind, text))
+    output = [re.sub(r'[ \t]*\n\s*', '\n', text) if kind == 'code' else text for kind, text in pieces]
+    return ''.join(output).strip() + '\n'
+
+
+def minify_css(source):
+    """Drop comments and collapse whitespace outside quoted strings."""
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    output = []
+    for part in re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source):
+        if part[:1] in ('"', "'"):
+            output.append(part)
+            continue
+        part = re.sub(r'/\*.*?\*/', '', part, flags=re.S)
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+        part = re.sub(r':\s+', ':', part)
+        output.append(part.replace(';}', '}'))
+    return ''.join(output).strip() + '\n'
+
+
+def _fingerprinted(relative_path, data, extension=None):
+    base, original_extension = os.path.splitext(relative_path)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f"{base}.{digest}{extension or original_extension}"
+
+
+def _write(relative_path, data, compress):
+    path = os.path.join(DIST_DIR, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as output:
+        output.write(data)
+    encodings = []
+    if compress:
+        with open(f"{path}.gz", 'wb') as output:
+            output.write(gzip.compress(data, compresslevel=9, mtime=0))
+        encodings.append('gzip')
+        if brotli is not None:
+            with open(f"{path}.br", 'wb') as output:
+                output.write(brotli.compress(data, quality=11))
+            encodings.append('br')
+    return encodings
+
+
+def _image_variants(source_path, relative_path):
+    """Resized WebP/JPEG variants: ``{format: {width: path}}``."""
+    variants = {'webp': {}, 'jpeg': {}}
+    with Image.open(source_path) as image:
+        image = image.convert('RGB')
+        for width in IMAGE_WIDTHS:
+            if width >= image.width:
+                continue
+            resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            base = os.path.splitext(relative_path)[0]
+            for image_format, extension in (('webp', '.webp'), ('jpeg', '.jpeg')):
+                buffer = BytesIO()
+                resized.save(buffer, format=image_format.upper(), quality=IMAGE_QUALITY, optimize=True)
+                data = buffer.getvalue()
+                output_path = _fingerprinted(f"{base}-{width}w{extension}", data)
+                _write(output_path, data, compress=False)
+                variants[image_format][width] = output_path
+    return variants
+
+
+def build(static_dir=STATIC_DIR):
+    """Rebuild ``static/dist`` and its manifest; returns the manifest."""
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    manifest = {}
+    for directory, subdirectories, files in os.walk(static_dir):
+        subdirectories[:] = [name for name in subdirectories if os.path.join(directory, name) != DIST_DIR]
+        for name in sorted(files):
+            source_path = os.path.join(directory, name)
+            relative_path = os.path.relpath(source_path, static_dir).replace(os.sep, '/')
+            extension = os.path.splitext(name)[1].lower()
+            with open(source_path, 'rb') as source:
+                data = source.read()
+            if extension == '.js':
+                data = minify_js(data.decode('utf-8')).encode('utf-8')
+            elif extension == '.css':
+                data = minify_css(data.decode('utf-8')).encode('utf-8')
+
+            output_path = _fingerprinted(relative_path, data)
+            entry = {'path': output_path, 'encodings': _write(output_path, data, extension in TEXT_EXTENSIONS)}
+            if extension in IMAGE_EXTENSIONS and Image is not None:
+                entry['variants'] = _image_variants(source_path, relative_path)
+            manifest[relative_path] = entry
+
+    with open(MANIFEST_PATH, 'w') as output:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+    return manifest
+
+
+_manifest = None
+
+
+def load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as manifest_file:
+                _manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(endpoint, **values):
+    """
+    ``url_for()`` that resolves ``'static'`` files to their fingerprinted build.
+
+    For images, ``width=`` picks the smallest variant at least that wide and
+    ``image_format=`` ('webp' or 'jpeg', default 'webp') its format. Files not
+    in the manifest (or when there is no build) get the plain ``url_for`` URL.
+    """
+    width = values.pop('width', None)
+    image_format = values.pop('image_format', 'webp')
+    entry = load_manifest().get(values.get('filename')) if endpoint == 'static' else None
+    if entry is None:
+        return url_for(endpoint, **values)
+
+    path = entry['path']
+    variants = entry.get('variants', {}).get(image_format, {})
+    if width is not None and variants:
+        wide_enough = sorted(int(size) for size in variants if int(size) >= width)
+        if wide_enough:
+            path = variants[str(wide_enough[0])]
+    return url_for('hashed_asset', filename=path)
+
+
+def image_srcset(filename, image_format='webp'):
+    """``srcset`` attribute value listing every resized variant of ``filename``."""
+    variants = load_manifest().get(filename, {}).get('variants', {}).get(image_format, {})
+    return ', '.join(f"{url_for('hashed_asset', filename=path)} {width}w"
+                     for width, path in sorted(variants.items(), key=lambda item: int(item[0])))
+
+
+def send_asset(filename):
+    """Serve a built asset, precompressed when the client accepts it, with immutable caching."""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if name in request.accept_encodings and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+            encoding, filename = name, filename + suffix
+            break
+    response = send_from_directory(DIST_DIR, filename, mimetype=mimetype, max_age=31536000)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+if __name__ == '__main__':
+    built = build()
+    print(f"Built {len(built)} assets into {DIST_DIR}"
+          f"{'' if brotli else ' (no brotli variants: pip install brotli)'}"
+          f"{'' if Image else ' (no resized images: pip install Pillow)'}", file=sys.stderr)
@@ -0,0 +1,236 @@
+"""
+Endpoint benchmarks against a local database stand-in.
+
+Loads synthetic indicators and scorecard values at each requested scale into a
+local database, drives the Flask app in-process and reports p50/p95 latency,
+throughput, response size and peak Python memory per endpoint. Run from the
+repository root:
+
+    python -m benchmarks.run --scales 1 10 --iterations 20 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --scales 1 10 --iterations 20 --compare benchmarks/baseline.json
+
+``benchmarks/baseline.json`` is the committed baseline from the first command
+(warm cache, SQLite). Timings depend on the machine, so re-save it on the one
+you compare on.
+
+``--database-url`` points the app at a local Postgres instead of the default
+SQLite file; the tables in that database are replaced with synthetic data.
+
+Every response's status is counted; any non-2xx response fails the run, so an
+endpoint that errors cannot pass with normal-looking latencies.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+READ_ENDPOINTS = [
+    '/api/scorecard_chart',
+    '/api/scorecard_chart?format=columnar',
+    '/api/scorecard_chart/grouped',
+    '/api/scorecard_chart/grouped?format=columnar',
+    '/api/latest_values',
+    '/api/aggregates',
+    '/api/scorecard_indicators',
+    '/api/scorecard_indicators?format=normalized',
+    '/api/indicators',
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def scorecard_payload(row, value):
+    return {
+        'secondary_id': row['secondary_id'], 'id': row['id'], 'category_id': row['category_id'],
+        'group_name': row['group_name'], 'indicator': row['indicator'], 'proxy': row['proxy'],
+        'country': row['country'], 'year': row['year'], 'year_type': row['year_type'],
+        'source': row['source'], 'value': str(value), 'value_n': str(value), 'value_map': str(value),
+        'value_standardized': row['value_standardized'], 'positive': row['positive'],
+        'value_standardized_table': row['value_standardized_table'],
+    }
+
+
+def build_requests(scorecards, rng):
+    """(name, callable(client) -> response) for every benchmarked endpoint."""
+    requests = [(path, lambda client, path=path: client.get(path)) for path in READ_ENDPOINTS]
+    requests.append(('POST /api/save_scorecard', lambda client: client.post(
+        '/api/save_scorecard', json=scorecard_payload(rng.choice(scorecards), rng.uniform(0, 1000)))))
+    requests.append(('POST /api/save_scorecard/batch (100 rows)', lambda client: client.post(
+        '/api/save_scorecard/batch',
+        json=[scorecard_payload(row, rng.uniform(0, 1000)) for row in rng.sample(scorecards, 100)])))
+    return requests
+
+
+def measure(app, request, iterations, concurrency, cold, snapshot_cache):
+    """Run ``request`` ``iterations`` times and summarize latency, size and memory."""
+    latencies, sizes, statuses = [], [], Counter()
+    lock = threading.Lock()
+
+    def run_once(client):
+        if cold:
+            snapshot_cache.invalidate()
+        started = time.perf_counter()
+        response = request(client)
+        body = response.get_data()  # Drain streamed bodies inside the timed section
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            sizes.append(len(body))
+            statuses[response.status_code] += 1
+
+    run_once(app.test_client())  # Warm-up, not recorded
+    latencies.clear()
+    sizes.clear()
+    statuses.clear()
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        clients = [app.test_client() for _ in range(concurrency)]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda index: run_once(clients[index % concurrency]), range(iterations)))
+    else:
+        client = app.test_client()
+        for _ in range(iterations):
+            run_once(client)
+    wall = time.perf_counter() - started
+
+    # Peak memory is measured separately so tracing does not skew the latencies
+    if cold:
+        snapshot_cache.invalidate()
+    tracemalloc.start()
+    request(app.test_client()).get_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'throughput_rps': round(iterations / wall, 2),
+        'response_bytes': int(statistics.median(sizes)),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def run(args):
+    # The engine is configured from the environment when db.py is imported
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('CACHE_TTL_SECONDS', '3600')
+    if args.snapshot:
+        os.environ['SNAPSHOT_ENABLED'] = 'true'
+        os.environ['SNAPSHOT_PATH'] = os.path.join(tempfile.mkdtemp(), 'snapshot.bin')
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from benchmarks import synthetic
+    from Classes.LatestValue import refresh_latest_values
+    from cache import snapshot_cache
+    from db import Session, init_db
+    from main import app
+    from shared_snapshot import shared_snapshot
+
+    init_db()
+    results = {}
+    for scale in args.scales:
+        session = Session()
+        try:
+            indicator_count, scorecard_count = synthetic.load(session, scale, seed=args.seed)
+            refresh_latest_values(session)  # Loaded directly, not through the saves
+            session.commit()
+        finally:
+            Session.remove()
+        _, scorecards = synthetic.generate(scale, seed=args.seed)
+        if shared_snapshot.enabled:
+            shared_snapshot.rebuild()
+        snapshot_cache.invalidate()
+        print(f"\nScale {scale:g}x: {indicator_count} indicators, {scorecard_count} scorecard values"
+              f" ({'cold' if args.cold else 'warm'} cache, concurrency {args.concurrency}"
+              f"{', shared snapshot' if shared_snapshot.enabled else ''})")
+        print(f"{'endpoint':48} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>9} {'bytes':>11} {'peak KB':>10}  statuses")
+
+        rng = random.Random(args.seed)
+        for name, request in build_requests(scorecards, rng):
+            stats = measure(app, request, args.iterations, args.concurrency, args.cold, snapshot_cache)
+            results[f"{scale:g}x {'cold' if args.cold else 'warm'} {name}"] = stats
+            print(f"{name:48} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['throughput_rps']:9.1f}"
+                  f" {stats['response_bytes']:11d} {stats['peak_memory_kb']:10.1f}"
+                  f"  {' '.join(f'{status}x{count}' for status, count in stats['statuses'].items())}")
+    return results
+
+
+def failures(results):
+    """Names of the endpoints that answered anything other than 2xx."""
+    return [name for name, stats in results.items()
+            if any(not 200 <= int(status) < 300 for status in stats['statuses'])]
+
+
+def compare(results, baseline, threshold):
+    """Print p95 changes against ``baseline``; returns the names that regressed."""
+    regressions = []
+    print(f"\nCompared with baseline (regression threshold {threshold:.0%} on p95):")
+    for name, stats in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"  {name}: no baseline")
+            continue
+        change = (stats['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0.0
+        marker = 'REGRESSION' if change > threshold else ''
+        print(f"  {name}: p95 {previous['p95_ms']:.2f} -> {stats['p95_ms']:.2f} ms ({change:+.1%})"
+              f", bytes {previous['response_bytes']} -> {stats['response_bytes']} {marker}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10],
+                        help="data sizes as multiples of the production row count")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=1, help="concurrent in-process clients")
+    parser.add_argument('--cold', action='store_true', help="invalidate the snapshot cache before every request")
+    parser.add_argument('--snapshot', action='store_true', help="serve reads from the memory-mapped shared snapshot")
+    parser.add_argument('--database-url', default=None,
+                        help="local database to use (default: a temporary SQLite file)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH')
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed p95 increase before failing")
+    args = parser.parse_args()
+
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+
+    results = run(args)
+    failed = failures(results)
+    if failed:
+        print("\nNon-2xx responses from:")
+        for name in failed:
+            print(f"  {name}: {results[name]['statuses']}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        if regressions:
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
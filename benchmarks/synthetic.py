@@ -0,0 +1,80 @@
+import random
+
+from sqlalchemy import insert
+
+from Classes.Indicator import Indicator
+from Classes.ScorecardValues import ScoreCardIndicator2
+from main import COUNTRY_COLUMN_PREFIXES
+
+COUNTRIES = ["Afghanistan", "Bangladesh", "India", "Maldives", "Nepal", "Pakistan", "Sri Lanka",
+             "South Asia Region", "SARw/oIndia"]
+GROUPS = ["Vision", "Prosperity", "Digital", "Infrastructure", "Inclusion", "Sustainability"]
+
+# Roughly the size of the production tables at scale 1
+BASE_INDICATORS = 60
+YEAR_TYPES = (1, 2, 3)
+
+
+def generate(scale=1, seed=0):
+    """Return ``(indicators, scorecards)`` row dicts for ``scale`` times the base size."""
+    rng = random.Random(seed)
+    indicators, scorecards = [], []
+    secondary_id = 1
+    for indicator_id in range(1, int(BASE_INDICATORS * scale) + 1):
+        group_index = indicator_id % len(GROUPS)
+        name = f"Synthetic indicator {indicator_id}"
+        indicator = {
+            'id': indicator_id,
+            'indicator_id': indicator_id,
+            'api_url': f"https://api.worldbank.org/v2/country/all/indicator/SYN.{indicator_id}",
+            'category': GROUPS[group_index],
+            'category_id': group_index + 1,
+            'dataset': 'WDI',
+            'proxy': '',
+            'source': 'World Bank',
+            'indicator_code': f"SYN.{indicator_id}",
+            'indicator_name': name,
+            'positive_negative_indicator': indicator_id % 3 != 0,
+            'number_percent': indicator_id % 2 == 0,
+            'notes': 'Synthetic benchmark data. ' * 4,
+        }
+        for prefix in COUNTRY_COLUMN_PREFIXES.values():
+            indicator[f'{prefix}_year'] = str(rng.randint(2015, 2023))
+            indicator[f'{prefix}_year_type'] = rng.choice(YEAR_TYPES)
+        indicators.append(indicator)
+
+        for country in COUNTRIES:
+            for year_type in YEAR_TYPES:
+                value = round(rng.uniform(0, 1000), 2)
+                scorecards.append({
+                    'secondary_id': secondary_id,
+                    'id': indicator_id,
+                    'category_id': group_index + 1,
+                    'group_name': GROUPS[group_index],
+                    'indicator': name,
+                    'proxy': '',
+                    'country': country,
+                    'year': str(2012 + 3 * year_type),
+                    'year_type': year_type,
+                    'source': 'World Bank',
+                    'value': f"{value:,}",
+                    'value_n': str(value),
+                    'value_map': str(value),
+                    'value_standardized': round(rng.uniform(0, 100), 4),
+                    'positive': indicator['positive_negative_indicator'],
+                    'value_standardized_table': round(rng.uniform(-100, 100), 4),
+                    'percent_number': indicator['number_percent'],
+                })
+                secondary_id += 1
+    return indicators, scorecards
+
+
+def load(session, scale=1, seed=0):
+    """Replace the contents of both tables with synthetic data; returns the row counts."""
+    indicators, scorecards = generate(scale, seed)
+    session.execute(ScoreCardIndicator2.__table__.delete())
+    session.execute(Indicator.__table__.delete())
+    session.execute(insert(Indicator.__table__), indicators)
+    session.execute(insert(ScoreCardIndicator2.__table__), scorecards)
+    session.commit()
+    return len(indicators), len(scorecards)
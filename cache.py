@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+class SnapshotCache:
+    """
+    In-process cache of serialized API payloads, tagged with a data version.
+
+    The save handlers call ``bump_version()`` after every successful commit, which
+    drops every cached payload at once. Saves in other gunicorn workers and
+    instances are picked up through ``follow()``: every ``check_seconds`` a
+    request passes in the change-log version, which all processes share, and a
+    new one drops the cache too. Entries also expire after ``ttl_seconds`` as a
+    safety net.
+    """
+
+    def __init__(self, max_entries, ttl_seconds, check_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.check_seconds = check_seconds
+        self._entries = OrderedDict()  # key -> (version, stored_at, payload)
+        self._version = 0
+        self._shared_version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def get_or_build(self, key, builder):
+        """Return the cached payload for ``key``, calling ``builder()`` on a miss.
+
+        A ``None`` result from the builder is never cached, so errors are retried
+        on the next request.
+        """
+        payload, version = self.lookup(key)
+        if payload is not None:
+            return payload
+
+        # Build outside the lock so a slow query does not block cache hits
+        payload = builder()
+        if payload is None:
+            return None
+        self.store(key, version, payload)
+        return payload
+
+    def lookup(self, key):
+        """``(payload, version)``: the cached payload or ``None``, and the version to ``store()`` a new one under."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                version, stored_at, payload = entry
+                if version == self._version and now - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload, version
+                del self._entries[key]
+            self.misses += 1
+            return None, self._version
+
+    def store(self, key, version, payload):
+        """Cache ``payload`` built from data at ``version``, unless a write happened since."""
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (version, time.monotonic(), payload)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+    def bump_version(self):
+        """Mark the underlying data as changed and drop every cached payload."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            return self._version
+
+    def invalidate(self):
+        return self.bump_version()
+
+    def check_due(self):
+        """Whether to ``follow()`` the shared version now; claims the check, so concurrent requests make one."""
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+                return False
+            self._checked_at = now
+            return True
+
+    def follow(self, shared_version):
+        """Drop every cached payload if ``shared_version`` moved since the last call; returns True if it did."""
+        with self._lock:
+            changed = self._shared_version is not None and shared_version != self._shared_version
+            self._shared_version = shared_version
+        if changed:
+            self.bump_version()
+        return changed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'shared_version': self._shared_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+snapshot_cache = SnapshotCache(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_SECONDS, config.CACHE_VERSION_CHECK_SECONDS)
@@ -0,0 +1,439 @@
+"""
+Collect indicator values from their sources and save the ones that changed.
+
+``python collector.py`` walks ``indicators_revised`` and fetches every source
+concurrently: the indicator's ``api_url``, or the World Bank API URL for its
+``indicator_code`` when it has none. Requests to the same host are spaced out
+(COLLECTOR_REQUESTS_PER_SECOND), and each response is cached on disk with its
+ETag/Last-Modified, so a source that has not changed costs one ``304`` and is
+not parsed again.
+
+World Bank-style JSON responses (``[meta, observations]``, paged) are parsed
+into a value per country and year:
+
+* existing ``scorecard_indicators3`` rows for a country and year whose value
+  differs are updated;
+* when a country has a more recent observation than its row for the
+  indicator's year type, that row moves to the new year and value (a row is
+  inserted only if the country has none for that year type), and the
+  indicator's year column for the country follows;
+
+all through the same upsert, change log and post-save work as the batch save
+endpoint. ``--dry-run`` prints the changes without writing them, and
+``WORLD_BANK_API_URL`` (or a local ``api_url``) points the collector at a stub
+server for testing.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+
+import config
+
+# World Bank country code -> scorecard country, and its Indicator year columns prefix
+WORLD_BANK_COUNTRIES = {
+    'AFG': ('Afghanistan', 'afghanistan'),
+    'BGD': ('Bangladesh', 'bangladesh'),
+    'IND': ('India', 'india'),
+    'MDV': ('Maldives', 'maldives'),
+    'NPL': ('Nepal', 'nepal'),
+    'PAK': ('Pakistan', 'pakistan'),
+    'LKA': ('Sri Lanka', 'sri_lanka'),
+    'SAS': ('South Asia Region', None),
+}
+PER_PAGE = 1000
+DEFAULT_YEAR_TYPE = 1
+USER_AGENT = 'ScorecardSouthAsia-collector'
+
+Fetched = namedtuple('Fetched', 'url status headers body')
+
+
+class ResponseCache:
+    """Response bodies on disk with the validators needed to revalidate them."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, url, extension):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + extension)
+
+    def get(self, url):
+        """``(metadata, body)`` for ``url``, or ``None`` when it is not cached."""
+        try:
+            with open(self._path(url, '.json')) as metadata_file:
+                metadata = json.load(metadata_file)
+            with open(self._path(url, '.body'), 'rb') as body_file:
+                return metadata, body_file.read()
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, url):
+        cached = self.get(url)
+        if cached is None:
+            return {}
+        metadata, _ = cached
+        headers = {}
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+        return headers
+
+    def store(self, fetched):
+        """Cache a ``200`` response, if it carries a validator."""
+        etag, last_modified = fetched.headers.get('ETag'), fetched.headers.get('Last-Modified')
+        if fetched.status != 200 or not (etag or last_modified):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        metadata = {'url': fetched.url, 'etag': etag, 'last_modified': last_modified, 'stored_at': time.time()}
+        # Body first, then the metadata that makes it valid, each replaced atomically
+        for extension, data in (('.body', fetched.body), ('.json', json.dumps(metadata).encode('utf-8'))):
+            path = self._path(fetched.url, extension)
+            with open(f"{path}.tmp", 'wb') as output:
+                output.write(data)
+            os.replace(f"{path}.tmp", path)
+
+
+class HostRateLimiter:
+    """Starts requests to the same host at least ``1 / per_second`` seconds apart."""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next_start = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host):
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def _http_get(url, headers, timeout):
+    """Blocking GET; returns ``(status, headers, body)`` with ``304`` as a normal status."""
+    request = urllib.request.Request(url, headers=dict(headers, **{
+        'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip', 'Accept': 'application/json',
+    }))
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            return response.status, response.headers, body
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, e.headers, b''
+        raise
+
+
+def _with_query(url, **params):
+    """``url`` with ``params`` added to its query string, unless already there."""
+    parts = urllib.parse.urlsplit(url)
+    query = dict(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    for name, value in params.items():
+        if name == 'page' or name not in query:
+            query[name] = str(value)
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def source_url(indicator):
+    """The URL to collect ``indicator`` from, or ``None`` when it has no automated source."""
+    if indicator.api_url:
+        url = indicator.api_url.strip()
+    elif indicator.indicator_code:
+        countries = ';'.join(WORLD_BANK_COUNTRIES)
+        code = urllib.parse.quote(indicator.indicator_code.strip(), safe='.')
+        url = f"{config.WORLD_BANK_API_URL.rstrip('/')}/country/{countries}/indicator/{code}"
+    else:
+        return None
+    return _with_query(url, format='json', per_page=PER_PAGE)
+
+
+def parse_world_bank(body):
+    """
+    Parse one page of a World Bank API response.
+
+    Returns ``(pages, observations)`` where observations are ``(country code,
+    year, value)`` with missing values left out. Raises ValueError for API
+    error messages and for anything that is not World Bank-style JSON.
+    """
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise ValueError("Response is not JSON")
+    if isinstance(payload, list) and payload and isinstance(payload[0], dict) and 'message' in payload[0]:
+        messages = payload[0]['message'] or [{}]
+        raise ValueError(f"World Bank API error: {messages[0].get('value') or messages[0]}")
+    if not (isinstance(payload, list) and len(payload) >= 1 and isinstance(payload[0], dict)):
+        raise ValueError("Not a World Bank-style response")
+
+    pages = int(payload[0].get('pages') or 1)
+    observations = []
+    for record in (payload[1] if len(payload) > 1 and payload[1] else []):
+        code = record.get('countryiso3code') or (record.get('country') or {}).get('id')
+        if record.get('value') is None or code not in WORLD_BANK_COUNTRIES:
+            continue
+        observations.append((code, str(record['date']), record['value']))
+    return pages, observations
+
+
+def format_value(value):
+    """Stored (string) form of a numeric source value."""
+    return format(value, '.15g') if isinstance(value, float) else str(value)
+
+
+class Collector:
+    """Concurrent, rate-limited, conditionally cached fetches of indicator sources."""
+
+    def __init__(self, cache, concurrency=None, requests_per_second=None, timeout=None, retries=None, force=False):
+        self.cache = cache
+        self.concurrency = concurrency or config.COLLECTOR_CONCURRENCY
+        self.requests_per_second = config.COLLECTOR_REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second
+        self.timeout = timeout or config.COLLECTOR_TIMEOUT
+        self.retries = config.COLLECTOR_RETRIES if retries is None else retries
+        self.force = force
+        self.requests = self.not_modified = 0
+
+    async def fetch(self, url, revalidate=True):
+        """GET ``url`` through the disk cache; a ``304`` returns the cached body."""
+        headers = self.cache.conditional_headers(url) if revalidate and not self.force else {}
+        host = urllib.parse.urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            await self._limiter.wait(host)
+            async with self._slots:
+                try:
+                    self.requests += 1
+                    status, response_headers, body = await asyncio.to_thread(_http_get, url, headers, self.timeout)
+                    break
+                except urllib.error.HTTPError as e:
+                    retry = e.code == 429 or e.code >= 500
+                    delay = e.headers.get('Retry-After') if e.headers else None
+                    error = e
+                except (urllib.error.URLError, OSError) as e:
+                    retry, delay, error = True, None, e
+            if not retry or attempt == self.retries:
+                raise error
+            await asyncio.sleep(float(delay) if delay and delay.isdigit() else 2 ** attempt)
+
+        if status == 304:
+            cached = self.cache.get(url)
+            if cached is not None:
+                self.not_modified += 1
+                return Fetched(url, 304, response_headers, cached[1])
+            # The cached body went missing after the request was sent: fetch it again in full
+            return await self.fetch(url, revalidate=False)
+        return Fetched(url, status, response_headers, body)
+
+    async def fetch_world_bank(self, url):
+        """Every page of a World Bank response: ``(observations, [Fetched])``."""
+        first = await self.fetch(url)
+        pages, observations = parse_world_bank(first.body)
+        rest = await asyncio.gather(*(self.fetch(_with_query(url, page=page)) for page in range(2, pages + 1)))
+        for fetched in rest:
+            observations.extend(parse_world_bank(fetched.body)[1])
+        return observations, [first] + list(rest)
+
+    async def collect(self, indicators):
+        """
+        Fetch every indicator's source concurrently.
+
+        Returns ``{indicator id: result}`` where a result has the ``url``, its
+        ``observations`` and the ``responses`` to cache once the values are saved,
+        ``changed`` false when every page was a ``304``, or an ``error``.
+        """
+        self._limiter = HostRateLimiter(self.requests_per_second)
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+        async def collect_one(indicator, url):
+            try:
+                observations, responses = await self.fetch_world_bank(url)
+            except Exception as e:
+                logging.error(f"Error collecting indicator {indicator.id} from {url}: {e}")
+                return {'url': url, 'error': str(e)}
+            return {'url': url, 'observations': observations, 'responses': responses,
+                    'changed': self.force or any(fetched.status != 304 for fetched in responses)}
+
+        sources = [(indicator, source_url(indicator)) for indicator in indicators]
+        sources = [(indicator, url) for indicator, url in sources if url]
+        results = await asyncio.gather(*(collect_one(indicator, url) for indicator, url in sources))
+        return {indicator.id: result for (indicator, _), result in zip(sources, results)}
+
+
+def plan_rows(session, indicators, observations_by_id):
+    """
+    The scorecard and indicator rows to upsert for collected ``observations_by_id``.
+
+    Returns ``(rows, indicator_rows)``. ``rows`` are in the shape of the save
+    endpoints' values: existing rows whose stored year has a changed value, and,
+    when a country has an observation more recent than its row for the year
+    type, that row moved to the new year and value. A new row is inserted only
+    when the country has no row for the year type, so there stays one per
+    indicator, country and year type. ``indicator_rows`` carry the per-country
+    year columns of indicators whose year moved.
+    """
+    from sqlalchemy import select
+    from Classes.LatestValue import year_rank
+    from Classes.ScorecardValues import ScoreCardIndicator2
+    from standardization import parse_numeric
+
+    table = ScoreCardIndicator2.__table__
+    columns = ['secondary_id', 'id', 'category_id', 'group_name', 'indicator', 'proxy', 'country', 'year',
+               'year_type', 'source', 'value', 'value_n', 'value_map', 'value_standardized', 'positive',
+               'value_standardized_table']
+    existing = {}
+    for row in session.execute(select(*(table.c[column] for column in columns))
+                               .where(table.c.id.in_(list(observations_by_id)))):
+        existing.setdefault((row.id, row.country), []).append(row._asdict())
+
+    year_columns = [f'{prefix}_year' for _, prefix in WORLD_BANK_COUNTRIES.values() if prefix]
+    rows = {}  # secondary_id, or (id, country, year type) for inserts -> row
+    indicator_rows = []
+    for indicator in indicators:
+        years = {column: getattr(indicator, column) for column in year_columns}
+        by_country = {}
+        for code, year, value in observations_by_id.get(indicator.id, ()):
+            by_country.setdefault(code, {})[year] = value
+        for code, values_by_year in by_country.items():
+            country, prefix = WORLD_BANK_COUNTRIES[code]
+            stored = existing.get((indicator.id, country), [])
+
+            for row in stored:
+                value = values_by_year.get(row['year'])
+                if value is not None and parse_numeric(row['value_n'] or row['value']) != parse_numeric(value):
+                    text = format_value(value)
+                    rows[row['secondary_id']] = dict(row, value=text, value_n=text, value_map=text)
+
+            year_type = getattr(indicator, f'{prefix}_year_type', None) if prefix else None
+            if year_type is None:
+                year_type = stored[0]['year_type'] if stored else DEFAULT_YEAR_TYPE
+            latest_year = max(values_by_year, key=year_rank)
+            current = max((row for row in stored if row['year_type'] == year_type),
+                          key=lambda row: (year_rank(row['year']), row['secondary_id']), default=None)
+            if current is not None and year_rank(latest_year) <= year_rank(current['year']):
+                continue
+            text = format_value(values_by_year[latest_year])
+            if prefix:
+                years[f'{prefix}_year'] = latest_year
+            if current is not None:
+                rows[current['secondary_id']] = dict(current, year=latest_year, value=text, value_n=text,
+                                                     value_map=text, value_standardized=None,
+                                                     value_standardized_table=None)
+                continue
+            template = stored[0] if stored else {}
+            rows[(indicator.id, country, year_type)] = {
+                'secondary_id': None,
+                'id': indicator.id,
+                'category_id': indicator.category_id,
+                'group_name': template.get('group_name') or indicator.category,
+                'indicator': indicator.indicator_name,
+                'proxy': indicator.proxy,
+                'country': country,
+                'year': latest_year,
+                'year_type': year_type,
+                'source': indicator.source,
+                'value': text,
+                'value_n': text,
+                'value_map': text,
+                'value_standardized': None,
+                'positive': indicator.positive_negative_indicator,
+                'value_standardized_table': None,
+            }
+        if any(years[column] != getattr(indicator, column) for column in year_columns):
+            indicator_rows.append({'id': indicator.id, **years})
+    return list(rows.values()), indicator_rows
+
+
+def run(indicator_ids=None, dry_run=False, force=False):
+    """Collect, save the changed values, and return a summary dict."""
+    from sqlalchemy import select
+    from Classes.Indicator import Indicator
+    from db import Session, use_primary
+    from main import after_scorecards_saved, write_indicators, write_scorecards
+
+    session = Session()
+    use_primary(session)
+    try:
+        query = select(Indicator).order_by(Indicator.id)
+        if indicator_ids:
+            query = query.where(Indicator.id.in_(indicator_ids))
+        indicators = session.scalars(query).all()
+        session.expunge_all()
+    finally:
+        session.close()
+
+    collector = Collector(ResponseCache(config.COLLECTOR_CACHE_DIR), force=force)
+    started = time.perf_counter()
+    results = asyncio.run(collector.collect(indicators))
+    changed = {indicator_id: result for indicator_id, result in results.items()
+               if 'error' not in result and result['changed']}
+
+    rows, indicator_rows = [], []
+    session = Session()
+    use_primary(session)
+    try:
+        to_plan = [indicator for indicator in indicators if indicator.id in changed]
+        rows, indicator_rows = plan_rows(session, to_plan, {indicator_id: result['observations']
+                                                            for indicator_id, result in changed.items()})
+        if rows and not dry_run:
+            if indicator_rows:
+                write_indicators(session, indicator_rows)
+            _, touched_indicators = write_scorecards(session, rows)
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+        Session.remove()
+
+    if not dry_run:
+        if rows:
+            # Also covers the indicators' year columns, which only change along with their rows
+            after_scorecards_saved({row['id'] for row in rows}, touched_indicators)
+        # Only now that the values are saved may the next run skip these responses on a 304
+        for result in changed.values():
+            for fetched in result['responses']:
+                collector.cache.store(fetched)
+
+    return {
+        'indicators': len(indicators),
+        'sources': len(results),
+        'changed_sources': len(changed),
+        'unchanged_sources': sum(1 for result in results.values() if 'error' not in result and not result['changed']),
+        'errors': {indicator_id: result['error'] for indicator_id, result in results.items() if 'error' in result},
+        'requests': collector.requests,
+        'not_modified': collector.not_modified,
+        'rows_updated': sum(1 for row in rows if row['secondary_id'] is not None),
+        'rows_inserted': sum(1 for row in rows if row['secondary_id'] is None),
+        'indicator_years_updated': len(indicator_rows),
+        'dry_run': dry_run,
+        **({'changes': rows, 'indicator_changes': indicator_rows} if dry_run else {}),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--indicator-id', type=int, nargs='+', help="only collect these indicators_revised ids")
+    parser.add_argument('--dry-run', action='store_true', help="fetch and report changes without saving them")
+    parser.add_argument('--force', action='store_true', help="ignore the response cache and refetch everything")
+    args = parser.parse_args()
+    summary = run(args.indicator_id, dry_run=args.dry_run, force=args.force)
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
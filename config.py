@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+# Snapshot cache for the read-only API endpoints (see cache.py)
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "64"))
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "300"))
+# How often each worker compares its cache with the change log, to see saves made elsewhere
+CACHE_VERSION_CHECK_SECONDS = float(os.environ.get("CACHE_VERSION_CHECK_SECONDS", "1"))
+
+# Database engine and connection pool (see db.py). DATABASE_URL, when set, is used
+# instead of the Cloud SQL connector, e.g. a local Postgres or SQLite stand-in.
+DATABASE_URL = os.environ.get("DATABASE_URL") or None
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_PREWARM = int(os.environ.get("DB_POOL_PREWARM", "0"))
+
+# Optional read replica for the GET endpoints, by URL or Cloud SQL instance name.
+# A client that has just saved reads from the primary, bypassing the response
+# cache and shared snapshot, for REPLICA_STICKY_SECONDS (with or without a replica).
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL") or None
+REPLICA_INSTANCE_CONNECTION_NAME = os.environ.get("REPLICA_INSTANCE_CONNECTION_NAME") or None
+REPLICA_STICKY_SECONDS = float(os.environ.get("REPLICA_STICKY_SECONDS", "5"))
+
+# Recompute value_standardized/value_standardized_table server-side after every
+# save instead of trusting the values sent by the data-entry forms (see standardization.py)
+STANDARDIZE_ON_SAVE = os.environ.get("STANDARDIZE_ON_SAVE", "false").lower() in ("1", "true", "yes")
+
+# Write-behind mode for the single-row save endpoints (see write_behind.py): saves
+# are validated, acknowledged with a ticket and committed in groups by a
+# background thread every WRITE_BEHIND_FLUSH_SECONDS
+WRITE_BEHIND = os.environ.get("WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_FLUSH_SECONDS = float(os.environ.get("WRITE_BEHIND_FLUSH_SECONDS", "0.5"))
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get("WRITE_BEHIND_MAX_BATCH", "500"))
+WRITE_BEHIND_TICKET_TTL = float(os.environ.get("WRITE_BEHIND_TICKET_TTL", "900"))
+
+# Memory-mapped snapshot of the scorecard tables shared by the workers of an
+# instance (see shared_snapshot.py); SNAPSHOT_CHECK_SECONDS bounds how long saves
+# made on other instances take to show up
+SNAPSHOT_ENABLED = os.environ.get("SNAPSHOT_ENABLED", "false").lower() in ("1", "true", "yes")
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH") or os.path.join(tempfile.gettempdir(), "scorecard_snapshot.bin")
+SNAPSHOT_CHECK_SECONDS = float(os.environ.get("SNAPSHOT_CHECK_SECONDS", "30"))
+
+# Source collector (collector.py): concurrent fetches, spaced per host, with
+# responses cached on disk for conditional revalidation
+COLLECTOR_CACHE_DIR = os.environ.get("COLLECTOR_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "scorecard_collector")
+COLLECTOR_CONCURRENCY = int(os.environ.get("COLLECTOR_CONCURRENCY", "8"))
+COLLECTOR_REQUESTS_PER_SECOND = float(os.environ.get("COLLECTOR_REQUESTS_PER_SECOND", "4"))
+COLLECTOR_TIMEOUT = float(os.environ.get("COLLECTOR_TIMEOUT", "30"))
+COLLECTOR_RETRIES = int(os.environ.get("COLLECTOR_RETRIES", "2"))
+WORLD_BANK_API_URL = os.environ.get("WORLD_BANK_API_URL", "https://api.worldbank.org/v2")
+
+# Server-Sent Events of saved changes (/api/events, see events.py). Each worker
+# follows the change log every EVENTS_POLL_SECONDS while streams are open and
+# serves at most EVENTS_MAX_STREAMS of them. Every open stream holds one gunicorn
+# thread, so this is a hard per-worker limit: keep it at GUNICORN_THREADS minus
+# the DB pool size (DB_POOL_SIZE + DB_MAX_OVERFLOW), the most other requests can
+# use at once anyway. Above it clients get a 503 and retry; App Engine adds
+# instances as load grows. See gunicorn.conf.py for why there is no async worker.
+EVENTS_POLL_SECONDS = float(os.environ.get("EVENTS_POLL_SECONDS", "2"))
+EVENTS_HISTORY = int(os.environ.get("EVENTS_HISTORY", "256"))
+EVENTS_MAX_STREAMS = int(os.environ.get("EVENTS_MAX_STREAMS", "48"))
+EVENTS_STREAM_SECONDS = float(os.environ.get("EVENTS_STREAM_SECONDS", "300"))
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get("EVENTS_KEEPALIVE_SECONDS", "15"))
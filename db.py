@@ -1,13 +1,87 @@
+import contextvars
+import logging
 import os
-from google.cloud.sql.connector import Connector, IPTypes
-import pg8000
+import threading
+import time
+
 import sqlalchemy
-from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import event
+from sqlalchemy.orm import Session as BaseSession, declarative_base, sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool, StaticPool
+
+import config
+
+
+class PoolStats:
+    """Counters for the connection pool, exported by ``pool_status()``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+                'wait_seconds_avg': round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else None,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sqlalchemy.exc.TimeoutError:
+            pool_stats.increment('timeouts')
+            raise
+        pool_stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def pool_options():
+    """Engine keyword arguments for the pool, configured through the environment (see config.py)."""
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config.DB_POOL_SIZE,
+        'max_overflow': config.DB_MAX_OVERFLOW,
+        'pool_timeout': config.DB_POOL_TIMEOUT,
+        'pool_recycle': config.DB_POOL_RECYCLE,
+        'pool_pre_ping': config.DB_POOL_PRE_PING,
+    }
+
 
+def connect_with_connector(instance_connection_name=None) -> sqlalchemy.engine.base.Engine:
+    # Imported here so DATABASE_URL setups do not need the Cloud SQL connector installed
+    from google.cloud.sql.connector import Connector, IPTypes
+    import pg8000
 
-def connect_with_connector() -> sqlalchemy.engine.base.Engine:
-    instance_connection_name = os.environ["INSTANCE_CONNECTION_NAME"]
+    instance_connection_name = instance_connection_name or os.environ["INSTANCE_CONNECTION_NAME"]
     db_user = os.environ["DB_USER"]
     db_pass = os.environ["DB_PASS"]
     db_name = os.environ["DB_NAME"]
@@ -30,13 +104,180 @@ def connect_with_connector() -> sqlalchemy.engine.base.Engine:
     pool = sqlalchemy.create_engine(
         "postgresql+pg8000://",
         creator=getconn,
+        **pool_options(),
     )
     return pool
 
-# Set up the database engine and session
-db_engine = connect_with_connector()
-SessionFactory = sessionmaker(bind=db_engine)
+
+def connect_with_url(url) -> sqlalchemy.engine.base.Engine:
+    """Engine for a plain database URL, e.g. a local Postgres or SQLite stand-in."""
+    if url in ('sqlite://', 'sqlite:///:memory:'):
+        # An in-memory database only exists on one connection, so it cannot be pooled
+        return sqlalchemy.create_engine(url, poolclass=StaticPool, connect_args={'check_same_thread': False})
+    connect_args = {'check_same_thread': False} if url.startswith('sqlite') else {}
+    return sqlalchemy.create_engine(url, connect_args=connect_args, **pool_options())
+
+
+def create_db_engine() -> sqlalchemy.engine.base.Engine:
+    engine = connect_with_url(config.DATABASE_URL) if config.DATABASE_URL else connect_with_connector()
+    return _instrument(engine)
+
+
+def create_replica_engine():
+    """Engine for the read replica, or ``None`` when no replica is configured."""
+    if config.DATABASE_REPLICA_URL:
+        return _instrument(connect_with_url(config.DATABASE_REPLICA_URL))
+    if config.REPLICA_INSTANCE_CONNECTION_NAME:
+        return _instrument(connect_with_connector(config.REPLICA_INSTANCE_CONNECTION_NAME))
+    return None
+
+
+def _instrument(engine):
+    event.listen(engine, 'connect', lambda dbapi_connection, record: pool_stats.increment('connects'))
+    event.listen(engine, 'invalidate', lambda dbapi_connection, record, exc: pool_stats.increment('invalidations'))
+    return engine
+
+
+def prewarm_pool(connections=None):
+    """
+    Open ``connections`` pooled connections up front (default DB_POOL_PREWARM).
+
+    Called once per gunicorn worker so the connector handshake is not paid by
+    the first user request. Connections are held together and then returned,
+    leaving them idle in the pool.
+    """
+    connections = config.DB_POOL_PREWARM if connections is None else connections
+    opened = 0
+    for engine in (get_engine(), get_replica_engine()):
+        if engine is None or connections <= 0:
+            continue
+        held = []
+        try:
+            for _ in range(min(connections, engine.pool.size()) if isinstance(engine.pool, QueuePool) else connections):
+                held.append(engine.connect())
+        except Exception as e:
+            logging.error(f"Error pre-warming connection pool: {e}")
+        finally:
+            for connection in held:
+                connection.close()
+        opened += len(held)
+    return opened
+
+
+def pool_status():
+    """Current pool occupancy plus the cumulative counters in ``pool_stats`` (shared by both engines)."""
+    status = _pool_occupancy(get_engine().pool)
+    if replica_configured():
+        status['replica'] = _pool_occupancy(get_replica_engine().pool)
+    status.update(pool_stats.snapshot())
+    return status
+
+
+def _pool_occupancy(pool):
+    status = {'pool': pool.__class__.__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'max_overflow': config.DB_MAX_OVERFLOW,
+        })
+    return status
+
+
+class RoutingSession(BaseSession):
+    """
+    Session that sends plain reads to the read replica and everything else to the primary.
+
+    Flushes, DML, and any statement that is not a SELECT go to the primary. After
+    one of them, the session stays on the primary so the rest of its transaction
+    reads its own writes, and for REPLICA_STICKY_SECONDS so does every session in
+    this process. Sessions marked with ``use_primary()``, and every
+    session while ``pin_primary()`` is in effect (non-GET requests, and reads
+    shortly after the client saved), never touch the replica. Without a replica
+    configured, everything goes to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not replica_configured():
+            return get_engine()
+        if self._flushing or (clause is not None and not getattr(clause, 'is_select', False)):
+            self.info['primary'] = True
+            note_write()
+            return get_engine()
+        if clause is None or self.info.get('primary') or _pinned.get():
+            return get_engine()
+        if time.monotonic() - _last_write < config.REPLICA_STICKY_SECONDS:
+            # The replica may not have this worker's latest write yet, and anything
+            # read now may be cached well past the write
+            return get_engine()
+        return get_replica_engine()
+
+
+_last_write = float('-inf')
+_pinned = contextvars.ContextVar('pinned_to_primary', default=False)
+
+
+def note_write():
+    """Record that this process just wrote to the primary (see RoutingSession)."""
+    global _last_write
+    _last_write = time.monotonic()
+
+
+def use_primary(session=None):
+    """Route every statement of ``session`` (default: the current scoped session) to the primary."""
+    (session or Session()).info['primary'] = True
+
+
+def pin_primary(pinned=True):
+    """Route every session in the current context (e.g. one request) to the primary, or stop doing so."""
+    _pinned.set(pinned)
+
+
+def primary_pinned():
+    """Whether the current context reads from the primary, bypassing caches that may predate a write."""
+    return _pinned.get()
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _engine(name, create):
+    engine = _engines.get(name)
+    if engine is None:
+        with _engines_lock:
+            if name not in _engines:
+                _engines[name] = create()
+            engine = _engines[name]
+    return engine
+
+
+def get_engine() -> sqlalchemy.engine.base.Engine:
+    """
+    The primary engine, created on first use.
+
+    Nothing connects (or constructs the Cloud SQL connector) at import time, so
+    importing the app or a model needs no credentials, and each gunicorn worker
+    creates its own engine after forking.
+    """
+    return _engine('primary', create_db_engine)
+
+
+def replica_configured():
+    return bool(config.DATABASE_REPLICA_URL or config.REPLICA_INSTANCE_CONNECTION_NAME)
+
+
+def get_replica_engine():
+    """The read replica engine, created on first use, or ``None`` when no replica is configured."""
+    return _engine('replica', create_replica_engine) if replica_configured() else None
+
+
+# Sessions pick their engine per statement (see RoutingSession), so none is bound here
+SessionFactory = sessionmaker(class_=RoutingSession)
 Session = scoped_session(SessionFactory)
+# The one metadata every model in Classes/ is declared on
 Base = declarative_base()
 
 
@@ -44,6 +285,45 @@ def init_db():
     """Initializes the database and creates tables if they don't exist."""
     from Classes.Indicator import Indicator
     from Classes.ScorecardValues import ScoreCardIndicator2
-    Base.metadata.create_all(bind=db_engine)
+    from Classes.ChangeLog import ChangeLog
+    from Classes.WriteTicket import WriteTicket
+    from Classes.LatestValue import LatestValue, refresh_latest_values
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, so add any indexes declared after the fact
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    # The saves keep latest_values current; fill it once when it is new
+    with SessionFactory() as session:
+        use_primary(session)
+        if session.scalar(sqlalchemy.select(LatestValue.id).limit(1)) is None:
+            refresh_latest_values(session)
+            session.commit()
     print("Database initialized and tables created.")
 
+
+
+def upsert(session, table, rows, key, chunk_size=500):
+    """Insert ``rows`` into ``table``, updating rows whose ``key`` already exists.
+
+    Each chunk is a single multi-row ``INSERT ... ON CONFLICT (key) DO UPDATE``.
+    The caller owns the transaction.
+    """
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported for the {dialect} dialect")
+
+    for start in range(0, len(rows), chunk_size):
+        statement = insert(table).values(rows[start:start + chunk_size])
+        statement = statement.on_conflict_do_update(
+            index_elements=[key],
+            set_={column: statement.excluded[column] for column in rows[0] if column != key},
+        )
+        session.execute(statement)
@@ -0,0 +1,132 @@
+import logging
+import threading
+from collections import deque, namedtuple
+
+import config
+from db import Session
+from serialization import dumps
+
+# ``data`` is the encoded SSE message covering change-log versions (since, version]
+Event = namedtuple('Event', 'since version data')
+
+
+def encode_event(version, changes):
+    """A ``scorecard`` Server-Sent Event; its id lets a reconnecting client resume after it."""
+    return b'id: %d\nevent: scorecard\ndata: %s\n\n' % (version, dumps(changes))
+
+
+class ChangeFeed:
+    """
+    Scorecard change events for the ``/api/events`` Server-Sent Events streams.
+
+    While at least one stream is open, a single thread per worker follows the
+    change log (every ``poll_seconds``, or as soon as a save in this worker calls
+    ``notify()``). Each batch of new entries becomes one event, in the same shape
+    as an ``/api/scorecard_chart?since=`` delta, and it is encoded only once.
+    Reset deltas are sent without their rows; the client reloads over HTTP
+    instead. The last ``history`` events are kept, so streams that reconnect
+    can resume.
+
+    Every stream waits on one shared condition, so an idle connection holds a
+    thread blocked on a lock and costs no database work.
+    """
+
+    def __init__(self, poll_seconds, history, max_streams):
+        self.poll_seconds = poll_seconds
+        self.max_streams = max_streams
+        self._events = deque(maxlen=history)
+        self._version = None  # Change-log version published up to; None until the first poll
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+        self._streams = 0
+        self.published = 0
+
+    def notify(self):
+        """Publish this worker's just-committed save now instead of at the next poll."""
+        if self._thread is not None:
+            self._wake.set()
+
+    def open_stream(self):
+        """Reserve a stream slot; ``False`` when ``max_streams`` are already open in this worker."""
+        with self._condition:
+            if self._streams >= self.max_streams:
+                return False
+            self._streams += 1
+            if self._thread is None:
+                # Started by the first stream, so each gunicorn worker runs its own thread after forking
+                self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return True
+
+    def close_stream(self):
+        with self._condition:
+            self._streams -= 1
+
+    def wait(self, after, timeout):
+        """
+        Events newer than version ``after``, waiting up to ``timeout`` seconds for one.
+
+        Returns ``(events, version)``. ``events`` is empty on timeout, or ``None``
+        when the history no longer reaches back to ``after`` (the client must
+        resync). ``after=None`` just waits for the current version.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._version is not None and (after is None or self._version > after), timeout)
+            version = self._version
+            if version is None or after is None or version <= after:
+                return [], version
+            events = [event for event in self._events if event.version > after]
+            if not events or events[0].since > after:
+                return None, version
+            return events, version
+
+    def stats(self):
+        with self._condition:
+            return {
+                'streams': self._streams,
+                'max_streams': self.max_streams,
+                'version': self._version,
+                'history': len(self._events),
+                'published': self.published,
+            }
+
+    def _run(self):
+        from Classes.ChangeLog import get_scorecard_chart_changes, latest_version
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            if self._streams == 0 and self._version is not None:
+                continue  # Nobody is listening; catch up when the next stream opens
+            try:
+                session = Session()
+                try:
+                    latest = latest_version(session)
+                finally:
+                    session.close()
+                if self._version is None or latest <= self._version:
+                    if self._version is None:
+                        self._publish(None, latest, None)
+                    continue
+                changes = get_scorecard_chart_changes(self._version)
+                if changes is not None:
+                    if changes['reset']:
+                        changes = {'version': changes['version'], 'reset': True}
+                    self._publish(self._version, changes['version'], changes)
+            except Exception as e:
+                logging.error(f"Error following the change log: {e}")
+            finally:
+                Session.remove()
+
+    def _publish(self, since, version, changes):
+        with self._condition:
+            if changes is not None:
+                self._events.append(Event(since, version, encode_event(version, changes)))
+                self.published += 1
+            self._version = version
+            self._condition.notify_all()
+
+
+change_feed = ChangeFeed(config.EVENTS_POLL_SECONDS, config.EVENTS_HISTORY, config.EVENTS_MAX_STREAMS)
@@ -0,0 +1,142 @@
+import csv
+import io
+
+from sqlalchemy import Boolean, Float, Integer, select
+
+from Classes.Indicator import Indicator
+from Classes.ScorecardValues import ScoreCardIndicator2
+from db import Session
+import metrics
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional; only CSV export is available without it
+    pyarrow = None
+
+BATCH_SIZE = 2000
+
+
+def _export_columns():
+    """(header, column) pairs for the scorecard_indicators3 + indicators_revised join."""
+    scorecards = ScoreCardIndicator2.__table__
+    indicators = Indicator.__table__
+    columns = [(column.name, column) for column in scorecards.columns]
+    columns += [(f"indicator_{column.name}", column) for column in indicators.columns if column.name != 'id']
+    return columns
+
+
+def export_select(group_name=None, country=None, year_type=None, category_id=None, indicator_id=None):
+    """Scorecard values joined to their indicator, with the dashboard filters applied."""
+    scorecards = ScoreCardIndicator2.__table__
+    indicators = Indicator.__table__
+    statement = (
+        select(*(column.label(header) for header, column in _export_columns()))
+        .select_from(scorecards.outerjoin(indicators, scorecards.c.id == indicators.c.id))
+        .order_by(scorecards.c.secondary_id)
+    )
+    if group_name is not None:
+        statement = statement.where(scorecards.c.group_name == group_name)
+    if country is not None:
+        statement = statement.where(scorecards.c.country == country)
+    if year_type is not None:
+        statement = statement.where(scorecards.c.year_type == year_type)
+    if category_id is not None:
+        statement = statement.where(scorecards.c.category_id == category_id)
+    if indicator_id is not None:
+        statement = statement.where(scorecards.c.id == indicator_id)
+    return statement
+
+
+def iter_export_batches(batch_size=BATCH_SIZE, **filters):
+    """
+    Yield the export rows in lists of at most ``batch_size`` tuples.
+
+    The query runs with ``yield_per`` (a server-side cursor where the driver
+    supports one), so memory is bounded by the batch size rather than the table.
+    """
+    session = Session()
+    try:
+        result = session.execute(export_select(**filters).execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        session.close()
+
+
+def stream_csv(**filters):
+    """Yield the export as CSV, one encoded chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in _export_columns()])
+    for batch in metrics.timed_query(iter_export_batches(**filters)):
+        with metrics.phase('serialize'):
+            writer.writerows(batch)
+            chunk = buffer.getvalue().encode('utf-8')
+        yield chunk
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _arrow_schema():
+    types = {Integer: pyarrow.int64(), Float: pyarrow.float64(), Boolean: pyarrow.bool_()}
+    fields = []
+    for header, column in _export_columns():
+        arrow_type = next((arrow_type for sql_type, arrow_type in types.items()
+                           if isinstance(column.type, sql_type)), pyarrow.string())
+        fields.append(pyarrow.field(header, arrow_type))
+    return pyarrow.schema(fields)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that collects bytes until they are drained."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_arrow(file_format, **filters):
+    """
+    Yield the export as Parquet (one row group per batch) or an Arrow IPC stream.
+
+    Requires pyarrow; check ``pyarrow is not None`` before calling.
+    """
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    if file_format == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+    try:
+        for batch in metrics.timed_query(iter_export_batches(**filters)):
+            with metrics.phase('serialize'):
+                columns = list(zip(*batch))
+                writer.write_table(pyarrow.Table.from_arrays(
+                    [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema,
+                ))
+                chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
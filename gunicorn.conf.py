@@ -0,0 +1,27 @@
+# Picked up automatically by `gunicorn main:app` (see app.yaml)
+import os
+
+# Each /api/events stream holds one thread for as long as it is open, blocked on a
+# lock while idle: a worker serves EVENTS_MAX_STREAMS (48) streams plus 16 threads
+# for other requests, which matches the 15 database connections those can use.
+# This is a deliberate capacity limit. A gevent or async worker would allow
+# thousands of idle streams, but would monkey-patch or run alongside the Cloud SQL
+# connector's own asyncio thread and the NumPy/SQLAlchemy request code, which is
+# not worth it for a dashboard with tens of concurrent viewers. Raise
+# GUNICORN_THREADS and EVENTS_MAX_STREAMS together if more are needed.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '64'))
+
+
+def post_worker_init(worker):
+    """Open the worker's database connections before it accepts requests."""
+    from db import prewarm_pool
+    opened = prewarm_pool()
+    if opened:
+        worker.log.info(f"Pre-warmed {opened} database connections")
+
+
+def worker_exit(server, worker):
+    """Commit any saves still waiting in the write-behind queue."""
+    import main
+    main.write_behind_queue.stop()
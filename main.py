@@ -1,14 +1,34 @@
 import logging
-
-from flask import Flask, render_template, jsonify, request, url_for
-
-from Classes.ScorecardChart import get_scorecard_chart_data
-from db import Session, init_db
-from Classes.Indicator import get_all_indicators, Indicator
-from Classes.ScorecardValues import get_scorecard_indicator2_data, ScoreCardIndicator2
-from sqlalchemy import cast, String
+import time
+from urllib.parse import urlencode
+
+from flask import Flask, render_template, jsonify, request, stream_with_context
+
+import assets
+from Classes.ChangeLog import INDICATOR, SCORECARD, get_scorecard_chart_changes, latest_version, record_changes
+from Classes.ScorecardChart import get_scorecard_chart_data, get_scorecard_chart_grouped
+from cache import snapshot_cache
+import config
+import export
+from db import Session, init_db, pin_primary, primary_pinned, prewarm_pool, upsert, pool_status
+import metrics
+import write_behind
+from rankings import ranking_store
+from aggregates import aggregate_store
+from events import change_feed, encode_event
+from serialization import Payload, dumps, to_columnar
+from shared_snapshot import shared_snapshot
+from standardization import standardize_indicators
+from Classes.Indicator import iter_indicators, Indicator
+from Classes.LatestValue import get_latest_values, refresh_latest_values
+from Classes.ScorecardValues import (
+    get_scorecard_indicator2_data, get_scorecard_indicator2_normalized, ScoreCardIndicator2, MAX_PAGE_SIZE
+)
+from sqlalchemy import insert, select
 
 app = Flask(__name__)
+metrics.init_app(app)
+app.jinja_env.globals.update(asset_url=assets.asset_url, image_srcset=assets.image_srcset)
 
 
 def initialize_database():
@@ -17,10 +37,142 @@ def initialize_database():
         init_db()
 
 
+def cached_json_response(cache_key, loader, not_found_message, change_version=False):
+    """
+    Serve the result of ``loader()`` as JSON through the snapshot cache.
+
+    With ``change_version``, the change-log version the payload is current as of
+    is sent in the ``X-Change-Version`` header, for clients that sync deltas.
+    Such loaders are called with the shared snapshot to read (``None`` for the
+    database), so the version comes from the same source as the rows.
+    """
+    def build():
+        with metrics.query_phase():
+            if not change_version:
+                version, data = None, loader()
+            else:
+                snapshot = shared_snapshot.current()
+                # The database version is read before the data: a change committed in
+                # between is sent again in the next delta rather than missed
+                version = snapshot.version if snapshot is not None else latest_version(Session())
+                data = loader(snapshot)
+        with metrics.phase('serialize'):
+            if not data:
+                return None
+            return Payload(dumps(data), {'X-Change-Version': str(version)} if version is not None else None)
+
+    if primary_pinned():
+        # Right after this client's own write: the cached payload may predate it
+        payload = build()
+    else:
+        payload = snapshot_cache.get_or_build(cache_key, build)
+    if payload is None:
+        return jsonify({"error": not_found_message}), 404
+    return payload_response(payload)
+
+
+def payload_response(payload, mimetype='application/json'):
+    """
+    Serve a cached ``Payload`` with its strong ETag.
+
+    A request whose ``If-None-Match`` names any representation of the payload
+    gets a ``304``, answered from the cache without touching the database.
+    Otherwise the body is sent in the best precompressed encoding the client
+    accepts.
+    """
+    encoding = next((name for name in payload.encodings() if name in request.accept_encodings), None)
+    if any(request.if_none_match.contains(payload.variant_etag(name)) for name in (None, 'br', 'gzip')):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(payload.body if encoding is None else payload.encoded(encoding),
+                                      mimetype=mimetype)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(payload.variant_etag(encoding))
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'  # Stored by browsers and the CDN, revalidated with the ETag
+    response.headers.update(payload.headers)
+    return response
+
+
+def query_cache_key(endpoint):
+    """Cache key for an endpoint that depends on its query string."""
+    return f"{endpoint}?{urlencode(sorted(request.args.items(multi=True)))}"
+
+
+def int_arg(name):
+    """Read an optional integer query parameter; raises ValueError if malformed."""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Query parameter '{name}' must be an integer")
+
+
+def scorecard_filters():
+    """The dashboard filters shared by the scorecard read and export endpoints."""
+    return {
+        'group_name': request.args.get('group_name') or None,
+        'country': request.args.get('country') or None,
+        'year_type': int_arg('year_type'),
+        'category_id': int_arg('category_id'),
+        'indicator_id': int_arg('indicator_id'),
+    }
+
+
+@app.before_request
+def follow_shared_snapshot():
+    # Another worker may have written a newer snapshot; cached payloads built from the old one are dropped
+    if shared_snapshot.refresh():
+        snapshot_cache.bump_version()
+
+
+@app.before_request
+def follow_change_log():
+    # Saves on other workers and instances: drop the payloads, and any snapshot, older than the change log
+    if not snapshot_cache.check_due():
+        return
+    try:
+        version = latest_version(Session())
+    except Exception as e:
+        logging.error(f"Error reading the change log version: {e}")
+        return
+    snapshot_cache.follow(version)
+    snapshot = shared_snapshot.current()
+    if snapshot is not None and snapshot.version < version:
+        shared_snapshot.mark_stale()  # Read from the database until the rebuild catches up
+
+
+# Set after a save; until it passes, this client's reads skip the replica, the
+# response cache and the shared snapshot, on any worker, so it sees its own writes
+PRIMARY_COOKIE = 'db_primary_until'
+
+
+@app.before_request
+def route_database_reads():
+    try:
+        sticky = float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        sticky = False
+    pin_primary(request.method not in ('GET', 'HEAD') or sticky)
+
+
+@app.after_request
+def remember_write(response):
+    if request.method not in ('GET', 'HEAD') and response.status_code < 400:
+        until = time.time() + config.REPLICA_STICKY_SECONDS
+        response.set_cookie(PRIMARY_COOKIE, f"{until:.3f}", max_age=int(config.REPLICA_STICKY_SECONDS) + 1,
+                            httponly=True, samesite='Lax')
+    return response
+
+
 @app.teardown_appcontext
 def shutdown_session(exception=None):
     """Remove the database session at the end of the request."""
     Session.remove()
+    pin_primary(False)
 
 
 @app.route('/')
@@ -39,38 +191,179 @@ def data_input():
 
 @app.route('/chart')
 def chart():
-    sar_image = url_for('static', filename='Assets/SAR_wo_India.jpeg')
-    sa_image = url_for('static', filename='Assets/SAR.jpeg')
-    return render_template('chart.html',
-                           sar_image=sar_image,
-                           sa_image=sa_image)
+    # The region map images are resolved by the template through asset_url()
+    return render_template('chart.html')
+
+
+@app.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    # Fingerprinted build output (see assets.py); the name changes whenever the content does
+    return assets.send_asset(filename)
 
 
 @app.route('/api/indicators', methods=['GET'])
 def get_indicators():
+    # Served from the cache once one full response has been streamed
+    fresh = primary_pinned()  # Right after this client's own write: skip the cache
+    payload, cache_version = snapshot_cache.lookup('indicators') if not fresh else (None, None)
+    if payload is not None:
+        return payload_response(payload)
+
     try:
-        indicators = get_all_indicators()
-        if indicators:
-            return jsonify(indicators)
-        else:
+        with metrics.query_phase():
+            indicators = iter_indicators()
+            first = next(indicators, None)
+        if first is None:
+            Session.remove()
             return jsonify({"error": "No indicators found"}), 404
     except Exception as e:
-        print(f"Error: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-    finally:
+        logging.error(f"Error fetching indicators: {e}")
         Session.remove()
+        return jsonify({"error": str(e)}), 500
+
+    def generate(chunk_size=64 * 1024):
+        # Stream the JSON array in chunks so the first bytes leave before the last
+        # indicator is serialized; the generator owns the session from here on
+        chunks = []
+        buffer = bytearray(b'[')
+        buffer += dumps(first)
+        try:
+            for indicator in metrics.timed_query(indicators):
+                with metrics.phase('serialize'):
+                    buffer += b','
+                    buffer += dumps(indicator)
+                if len(buffer) >= chunk_size:
+                    chunks.append(bytes(buffer))
+                    yield chunks[-1]
+                    buffer.clear()
+            buffer += b']'
+            chunks.append(bytes(buffer))
+            yield chunks[-1]
+            if not fresh:
+                snapshot_cache.store('indicators', cache_version, Payload(b''.join(chunks)))
+        except Exception as e:
+            # Headers are already sent, so the truncated body is the error signal
+            logging.error(f"Error streaming indicators: {e}")
+        finally:
+            indicators.close()
+            Session.remove()
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
 
 
 @app.route('/api/scorecard_chart', methods=['GET'])
 def get_scorecard_chart():
     try:
-        chart_scorecard = get_scorecard_chart_data()
-        if chart_scorecard:
-            return jsonify(chart_scorecard)
+        response_format = request.args.get('format', 'rows')
+        if response_format not in ('rows', 'columnar'):
+            return jsonify({"error": f"Unknown format '{response_format}'"}), 400
+        since = int_arg('since')
+
+        if since is not None:
+            # Delta sync: only the rows changed after the client's version
+            def loader():
+                changes = get_scorecard_chart_changes(since)
+                if changes and response_format == 'columnar':
+                    changes['rows'] = to_columnar(changes['rows'])
+                return changes
+        elif response_format == 'rows':
+            loader = get_scorecard_chart_data
         else:
-            return jsonify({"error": "No data found"}), 404
+            def loader(snapshot):
+                rows = get_scorecard_chart_data(snapshot)
+                return to_columnar(rows) if rows else rows
+        return cached_json_response(query_cache_key('scorecard_chart'), loader, "No data found",
+                                    change_version=since is None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logging.error(f"Error fetching scorecard chart: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        Session.remove()
+
+
+@app.route('/api/events', methods=['GET'])
+def scorecard_events():
+    """
+    Server-Sent Events: a ``scorecard`` event for each batch of saved changes.
+
+    Each event is an ``/api/scorecard_chart?since=`` delta for the versions since
+    the previous one. ``since`` (or ``Last-Event-ID`` on reconnect) replays what
+    the client missed; a client too far behind gets a reset event and reloads
+    over HTTP. Streams end after EVENTS_STREAM_SECONDS, and EventSource
+    reconnects where it left off, so threads are recycled.
+    """
+    try:
+        since = request.headers.get('Last-Event-ID') or request.args.get('since')
+        since = int(since) if since not in (None, '') else None
+    except ValueError:
+        return jsonify({"error": "since must be an integer version"}), 400
+    if not change_feed.open_stream():
+        response = jsonify({"error": "Too many event streams, retry shortly"})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    def generate():
+        try:
+            after = since
+            deadline = time.monotonic() + config.EVENTS_STREAM_SECONDS
+            yield b'retry: 5000\n\n'
+            while time.monotonic() < deadline:
+                events, version = change_feed.wait(after, config.EVENTS_KEEPALIVE_SECONDS)
+                if events is None:
+                    yield encode_event(version, {'version': version, 'reset': True})
+                elif events:
+                    yield b''.join(event.data for event in events)
+                else:
+                    yield b': keepalive\n\n'  # Comments keep proxies from closing an idle stream
+                if version is not None:
+                    after = version
+        finally:
+            change_feed.close_stream()
+
+    # No stream_with_context: the stream needs no request context or database session
+    response = app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/scorecard_chart/grouped', methods=['GET'])
+def get_scorecard_chart_grouped_view():
+    # Already nested as the dashboard's globalData, without rows that have no standardized value;
+    # ?format=columnar (what the dashboard loads) sends the rows once and their indices in globalData
+    try:
+        response_format = request.args.get('format', 'rows')
+        if response_format not in ('rows', 'columnar'):
+            return jsonify({"error": f"Unknown format '{response_format}'"}), 400
+        columnar = response_format == 'columnar'
+        return cached_json_response(query_cache_key('scorecard_chart/grouped'),
+                                    lambda snapshot: get_scorecard_chart_grouped(snapshot, columnar),
+                                    "No data found", change_version=True)
+    except Exception as e:
+        logging.error(f"Error fetching grouped scorecard chart: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        Session.remove()
+
+
+@app.route('/api/latest_values', methods=['GET'])
+def get_latest_values_view():
+    # Most recent value per indicator, country and year type, from the materialized latest_values table
+    try:
+        filters = {
+            'group_name': request.args.get('group_name') or None,
+            'country': request.args.get('country') or None,
+            'year_type': int_arg('year_type'),
+            'indicator_id': int_arg('indicator_id'),
+        }
+        return cached_json_response(query_cache_key('latest_values'), lambda: get_latest_values(**filters),
+                                    "No latest values found")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error fetching latest values: {e}")
         return jsonify({"error": str(e)}), 500
     finally:
         Session.remove()
@@ -79,18 +372,438 @@ def get_scorecard_chart():
 @app.route('/api/scorecard_indicators', methods=['GET'])
 def get_scorecard_indicators():
     try:
-        indicators_scorecard = get_scorecard_indicator2_data()
-        if indicators_scorecard:
-            return jsonify(indicators_scorecard)
-        else:
-            return jsonify({"error": "No data found"}), 404
+        filters = scorecard_filters()
+        fields = request.args.get('fields')
+        if fields:
+            filters['fields'] = [field.strip() for field in fields.split(',') if field.strip()]
+        limit = int_arg('limit')
+        after = int_arg('after')
+        if limit is not None and limit <= 0:
+            raise ValueError("Query parameter 'limit' must be positive")
+        response_format = request.args.get('format', 'rows')
+        if response_format not in ('rows', 'normalized'):
+            raise ValueError(f"Unknown format '{response_format}'")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 'normalized' sends each indicator's details once, keyed by ID, next to the values
+    normalized = response_format == 'normalized'
+    loader = get_scorecard_indicator2_normalized if normalized else get_scorecard_indicator2_data
+
+    try:
+        if limit is None:
+            # Every row, or every row after the ``after`` cursor
+            return cached_json_response(query_cache_key('scorecard_indicators'),
+                                        lambda: loader(after=after, **filters),
+                                        "No data found")
+
+        # Keyset pagination: the cursor is the last Secondary_ID of the page
+        if 'fields' in filters and 'Secondary_ID' not in filters['fields']:
+            filters['fields'].append('Secondary_ID')
+        page_size = min(limit, MAX_PAGE_SIZE)
+
+        def load_page():
+            page = loader(after=after, limit=page_size, **filters)
+            if page is None:
+                return None
+            items = page['values'] if normalized else page
+            next_after = items[-1]['Secondary_ID'] if len(items) == page_size else None
+            if normalized:
+                return dict(page, next_after=next_after)
+            return {'items': items, 'next_after': next_after}
+
+        return cached_json_response(query_cache_key('scorecard_indicators'), load_page, "No data found")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logging.error(f"Error fetching scorecard indicators: {e}")
         return jsonify({"error": str(e)}), 500
     finally:
         Session.remove()
 
 
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+@app.route('/api/export', methods=['GET'])
+def export_scorecard():
+    try:
+        filters = scorecard_filters()
+        file_format = request.args.get('format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown format '{file_format}'")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if file_format != 'csv' and export.pyarrow is None:
+        return jsonify({"error": f"{file_format} export requires pyarrow"}), 501
+
+    chunks = export.stream_csv(**filters) if file_format == 'csv' else export.stream_arrow(file_format, **filters)
+    mimetype, extension = EXPORT_FORMATS[file_format]
+    response = app.response_class(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="scorecard_export.{extension}"'
+    return response
+
+
+@app.route('/api/rankings', methods=['GET'])
+def get_rankings():
+    try:
+        sort_option = request.args.get('sort', 'year')
+        indicator = request.args.get('indicator') or None
+        year_type = int_arg('year_type')
+        return cached_json_response(query_cache_key('rankings'),
+                                    lambda: ranking_store.get(sort_option, indicator, year_type),
+                                    "No rankings found")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error fetching rankings: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        Session.remove()
+
+
+@app.route('/api/aggregates', methods=['GET'])
+def get_aggregates():
+    # South Asia and South Asia without India statistics per indicator and year type
+    try:
+        metric = request.args.get('metric', 'value')
+        indicator_id = int_arg('indicator_id')
+        year_type = int_arg('year_type')
+        return cached_json_response(query_cache_key('aggregates'),
+                                    lambda: aggregate_store.get(metric, indicator_id, year_type),
+                                    "No aggregates found")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error fetching aggregates: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        Session.remove()
+
+
+@app.route('/_ah/warmup', methods=['GET'])
+def warmup():
+    """
+    App Engine warmup request: open the database pool and prime the read caches.
+
+    Sent to a new instance before it receives traffic (see ``inbound_services``
+    in app.yaml), so the first user requests skip the connector handshake and
+    the cold queries. The views are called in this request's (empty) query
+    context, which gives them the same cache keys as a plain GET.
+    """
+    started = time.perf_counter()
+    connections = prewarm_pool(max(config.DB_POOL_PREWARM, 1))
+    if shared_snapshot.enabled and shared_snapshot.current() is None:
+        try:
+            shared_snapshot.rebuild()
+        except Exception as e:
+            logging.error(f"Error building snapshot during warmup: {e}")
+
+    primed = {}
+    for view in (get_scorecard_chart, get_scorecard_chart_grouped_view, get_scorecard_indicators,
+                 get_latest_values_view, get_rankings, get_aggregates):
+        response = view()
+        primed[view.__name__] = response[1] if isinstance(response, tuple) else response.status_code
+    return jsonify({
+        'connections': connections,
+        'primed': primed,
+        'seconds': round(time.perf_counter() - started, 3),
+    }), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    cache = snapshot_cache.stats()
+    pool = pool_status()
+    values = [
+        ('scorecard_cache_hits_total', "Snapshot cache hits.", cache['hits']),
+        ('scorecard_cache_misses_total', "Snapshot cache misses.", cache['misses']),
+        ('scorecard_cache_entries', "Payloads currently cached.", cache['entries']),
+        ('scorecard_data_version', "Data version of this worker's snapshot cache.", cache['version']),
+        ('scorecard_db_pool_checked_out', "Connections checked out of the pool.", pool.get('checked_out')),
+        ('scorecard_db_pool_overflow', "Connections open beyond the pool size.", pool.get('overflow')),
+        ('scorecard_db_pool_wait_seconds_total', "Total time spent waiting for a connection.",
+         pool['wait_seconds_total']),
+        ('scorecard_write_behind_pending', "Saves waiting in this worker's write-behind queue.",
+         write_behind_queue.stats()['pending']),
+    ]
+    return app.response_class(metrics.render(values), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(snapshot_cache.stats())
+
+
+@app.route('/api/pool/stats', methods=['GET'])
+def get_pool_stats():
+    return jsonify(pool_status())
+
+
+@app.route('/api/events/stats', methods=['GET'])
+def get_event_stats():
+    return jsonify(change_feed.stats())
+
+
+@app.route('/api/snapshot/stats', methods=['GET'])
+def get_snapshot_stats():
+    return jsonify(shared_snapshot.stats())
+
+
+@app.route('/api/cache/invalidate', methods=['POST'])
+def cache_invalidate():
+    shared_snapshot.mark_stale()
+    version = snapshot_cache.invalidate()
+    return jsonify({"message": "Cache invalidated", "version": version}), 200
+
+
+INDICATOR_REQUIRED_FIELDS = [
+    'id', 'indicator_id', 'api_url', 'dataset', 'indicator_code', 'indicator_name',
+    'positive_negative_indicator', 'number_percent', 'proxy', 'category',
+    'category_id', 'source', 'notes', 'years', 'year_types'
+]
+SCORECARD_REQUIRED_FIELDS = ['secondary_id', 'id', 'category_id', 'group_name', 'indicator', 'proxy', 'country',
+                             'year', 'year_type', 'source', 'value']
+
+# Country code used by the data-entry forms -> column prefix on indicators_revised
+COUNTRY_COLUMN_PREFIXES = {
+    'AFG': 'afghanistan',
+    'BAN': 'bangladesh',
+    'IND': 'india',
+    'MLD': 'maldives',
+    'NEP': 'nepal',
+    'PAK': 'pakistan',
+    'LAK': 'sri_lanka',
+}
+
+MAX_BATCH_SIZE = 1000
+
+
+def optional_int(value):
+    return int(value) if value not in (None, '') else None
+
+
+def optional_float(value):
+    return float(value) if value not in (None, '') else None
+
+
+def form_bool(value):
+    """Convert 'true'/'false' strings sent by the forms to booleans."""
+    return value if isinstance(value, bool) else value == 'true'
+
+
+def indicator_values(data):
+    """Map a save_indicator payload onto ``indicators_revised`` columns."""
+    values = {
+        'id': int(data['id']),
+        'indicator_id': int(data['indicator_id']),
+        'api_url': data['api_url'],
+        'dataset': data['dataset'],
+        'indicator_code': data['indicator_code'],
+        'indicator_name': data['indicator_name'],
+        'positive_negative_indicator': form_bool(data['positive_negative_indicator']),
+        'number_percent': form_bool(data['number_percent']),
+        'proxy': data['proxy'],
+        'category': data['category'],
+        'category_id': int(data['category_id']) if data['category_id'] else None,
+        'source': data['source'],
+        'notes': data['notes'],
+    }
+    for code, prefix in COUNTRY_COLUMN_PREFIXES.items():
+        year = data['years'].get(code)
+        values[f'{prefix}_year'] = str(year) if year not in (None, '') else None
+        values[f'{prefix}_year_type'] = optional_int(data['year_types'].get(code))
+    return values
+
+
+def scorecard_values(data):
+    """Map a save_scorecard payload onto ``scorecard_indicators3`` columns."""
+    return {
+        'secondary_id': optional_int(data['secondary_id']),
+        'id': optional_int(data['id']),
+        'category_id': optional_int(data['category_id']),
+        'group_name': data['group_name'],
+        'indicator': data['indicator'],
+        'proxy': data['proxy'],
+        'country': data['country'],
+        'year': data['year'],
+        'year_type': optional_int(data['year_type']),
+        'source': data['source'],
+        'value': data['value'],
+        'value_n': data.get('value_n'),
+        'value_map': data.get('value_map'),
+        'value_standardized': optional_float(data.get('value_standardized')),
+        'positive': data.get('positive'),
+        'value_standardized_table': optional_float(data.get('value_standardized_table')),
+    }
+
+
+def validate_batch(rows, required_fields, to_values, key):
+    """
+    Validate every row of a batch save before anything is written.
+
+    Returns the per-row results (in request order) and the ``(result, values)``
+    pairs for the rows that passed validation.
+    """
+    results, valid, seen_keys = [], [], set()
+    for index, data in enumerate(rows):
+        result = {'index': index}
+        results.append(result)
+        if not isinstance(data, dict):
+            result.update(status='invalid', error="Row must be an object")
+            continue
+        missing_fields = [field for field in required_fields if field not in data]
+        if missing_fields:
+            result.update(status='invalid', error=f"Missing required fields: {', '.join(missing_fields)}")
+            continue
+        try:
+            values = to_values(data)
+        except (TypeError, ValueError, AttributeError) as e:
+            result.update(status='invalid', error=str(e))
+            continue
+        result[key] = values[key]
+        if values[key] is not None:
+            if values[key] in seen_keys:
+                result.update(status='invalid', error=f"Duplicate {key} {values[key]} in batch")
+                continue
+            seen_keys.add(values[key])
+        valid.append((result, values))
+    return results, valid
+
+
+def batch_response(results):
+    saved = sum(1 for result in results if result['status'] == 'saved')
+    status_code = 200 if saved == len(results) else (207 if saved else 400)
+    with metrics.phase('serialize'):
+        response = jsonify({"saved": saved, "failed": len(results) - saved, "results": results})
+    return response, status_code
+
+
+def restandardize(indicator_ids):
+    """Recompute standardized scores after a save when STANDARDIZE_ON_SAVE is enabled."""
+    if not config.STANDARDIZE_ON_SAVE:
+        return
+    try:
+        standardize_indicators([indicator_id for indicator_id in indicator_ids if indicator_id is not None])
+    except Exception:
+        pass  # Logged by standardize_indicators; the save itself has already committed
+
+
+def after_indicators_saved(indicator_ids):
+    """Post-commit work for saved indicators."""
+    if config.STANDARDIZE_ON_SAVE:
+        restandardize(indicator_ids)
+        ranking_store.invalidate()
+    shared_snapshot.mark_stale()
+    snapshot_cache.bump_version()
+    change_feed.notify()
+
+
+def after_scorecards_saved(indicator_ids, indicator_names):
+    """Post-commit work for saved scorecard values, with every indicator name they touched."""
+    restandardize(indicator_ids)
+    shared_snapshot.mark_stale()
+    version = snapshot_cache.bump_version()
+    ranking_store.refresh_indicator(version, *indicator_names)
+    change_feed.notify()
+
+
+def write_indicators(session, rows):
+    """Upsert indicator rows and log the change in the caller's transaction."""
+    upsert(session, Indicator.__table__, rows, 'id')
+    record_changes(session, INDICATOR, [values['id'] for values in rows])
+
+
+def write_scorecards(session, rows):
+    """
+    Upsert scorecard rows and log the change in the caller's transaction.
+
+    Rows without a ``secondary_id`` are inserted and the database assigns one.
+    Returns those IDs (in order) and the indicator names touched, including the
+    names being overwritten so their rankings are refreshed too. The latest
+    values of every indicator touched (before or after) are refreshed as well.
+    """
+    table = ScoreCardIndicator2.__table__
+    existing = [values for values in rows if values['secondary_id'] is not None]
+    new = [{column: value for column, value in values.items() if column != 'secondary_id'}
+           for values in rows if values['secondary_id'] is None]
+
+    touched_indicators = {values['indicator'] for values in rows}
+    touched_ids = {values['id'] for values in rows}
+    if existing:
+        for previous in session.execute(
+            select(table.c.indicator, table.c.id)
+            .where(table.c.secondary_id.in_([values['secondary_id'] for values in existing]))
+        ):
+            touched_indicators.add(previous.indicator)
+            touched_ids.add(previous.id)
+
+    upsert(session, table, existing, 'secondary_id')
+    inserted = []
+    if new:
+        inserted = session.execute(
+            insert(table).returning(table.c.secondary_id, sort_by_parameter_order=True), new
+        ).scalars().all()
+    record_changes(session, SCORECARD, [values['secondary_id'] for values in existing] + inserted)
+    refresh_latest_values(session, touched_ids)
+    return inserted, touched_indicators
+
+
+def write_behind_group(session, indicators, scorecards):
+    """Writer for the write-behind queue: one grouped transaction for both tables."""
+    write_indicators(session, indicators)
+    inserted, touched_indicators = write_scorecards(session, scorecards)
+
+    def after_commit():
+        if indicators:
+            after_indicators_saved([values['id'] for values in indicators])
+        if scorecards:
+            after_scorecards_saved({values['id'] for values in scorecards}, touched_indicators)
+
+    return inserted, after_commit
+
+
+write_behind_queue = write_behind.WriteBehindQueue(
+    write_behind_group,
+    flush_interval=config.WRITE_BEHIND_FLUSH_SECONDS,
+    max_batch=config.WRITE_BEHIND_MAX_BATCH,
+    ticket_ttl=config.WRITE_BEHIND_TICKET_TTL,
+)
+
+
+@app.route('/api/save_status/<ticket>', methods=['GET'])
+def save_status(ticket):
+    try:
+        status = write_behind_queue.status(ticket)
+    except Exception as e:
+        logging.error(f"Error reading save status: {e}")
+        return jsonify({"error": str(e)}), 500
+    if status is None:
+        return jsonify({"error": "Unknown or expired ticket"}), 404
+    return jsonify(status), 200
+
+
+@app.route('/api/standardize', methods=['POST'])
+def standardize():
+    data = request.get_json(silent=True) or {}
+    try:
+        indicator_id = optional_int(data.get('indicator_id'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "indicator_id must be an integer"}), 400
+    try:
+        updated = standardize_indicators(None if indicator_id is None else [indicator_id])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    ranking_store.invalidate()
+    shared_snapshot.mark_stale()
+    snapshot_cache.bump_version()
+    change_feed.notify()
+    return jsonify({"message": "Standardized scores recomputed", "updated": updated}), 200
+
 
 @app.route('/api/save_indicator', methods=['POST'])
 def save_indicator():
@@ -98,89 +811,30 @@ def save_indicator():
     try:
         data = request.json
         # Validation: Ensure required fields are present
-        required_fields = [
-            'id', 'indicator_id', 'api_url', 'dataset', 'indicator_code', 'indicator_name',
-            'positive_negative_indicator', 'number_percent', 'proxy', 'category',
-            'category_id', 'source', 'notes', 'years', 'year_types'
-        ]
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = [field for field in INDICATOR_REQUIRED_FIELDS if field not in data]
         if missing_fields:
             return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}"}), 400
 
-        # Parse IDs and boolean values to correct types
-        indicator_id = int(data['id'])
-        data['indicator_id'] = int(data['indicator_id'])
-        data['category_id'] = int(data['category_id']) if data['category_id'] else None
-
-        # Convert 'true'/'false' strings to boolean
-        data['positive_negative_indicator'] = data['positive_negative_indicator'] if isinstance(data['positive_negative_indicator'], bool) else data['positive_negative_indicator'] == 'true'
-        data['number_percent'] = data['number_percent'] if isinstance(data['number_percent'], bool) else data['number_percent'] == 'true'
-
-        # Fetch existing indicator
-        indicator = session.query(Indicator).filter_by(id=indicator_id).first()
-
-        if not indicator:
-            # Create new indicator
-            indicator = Indicator(
-                id=indicator_id,
-                indicator_id=data['indicator_id'],
-                api_url=data['api_url'],
-                dataset=data['dataset'],
-                indicator_code=data['indicator_code'],
-                indicator_name=data['indicator_name'],
-                positive_negative_indicator=bool(data['positive_negative_indicator']),
-                number_percent=bool(data['number_percent']),
-                proxy=data['proxy'],
-                category=data['category'],
-                category_id=data['category_id'],
-                source=data['source'],
-                notes=data['notes'],
-                afghanistan_year=int(data['years'].get('AFG')),
-                bangladesh_year=int(data['years'].get('BAN')),
-                india_year=int(data['years'].get('IND')),
-                maldives_year=int(data['years'].get('MLD')),
-                nepal_year=int(data['years'].get('NEP')),
-                pakistan_year=int(data['years'].get('PAK')),
-                sri_lanka_year=int(data['years'].get('LAK')),
-                afghanistan_year_type=int(data['year_types'].get('AFG')),
-                bangladesh_year_type=int(data['year_types'].get('BAN')),
-                india_year_type=int(data['year_types'].get('IND')),
-                maldives_year_type=int(data['year_types'].get('MLD')),
-                nepal_year_type=int(data['year_types'].get('NEP')),
-                pakistan_year_type=int(data['year_types'].get('PAK')),
-                sri_lanka_year_type=int(data['year_types'].get('LAK'))
-            )
-            session.add(indicator)
-        else:
-            # Update existing indicator
-            indicator.indicator_id = data['indicator_id']
-            indicator.api_url = data['api_url']
-            indicator.dataset = data['dataset']
-            indicator.indicator_code = data['indicator_code']
-            indicator.indicator_name = data['indicator_name']
-            indicator.positive_negative_indicator = bool(data['positive_negative_indicator'])
-            indicator.number_percent = bool(data['number_percent'])
-            indicator.proxy = data['proxy']
-            indicator.category = data['category']
-            indicator.category_id = data['category_id']
-            indicator.source = data['source']
-            indicator.notes = data['notes']
-            indicator.afghanistan_year = data['years'].get('AFG')
-            indicator.bangladesh_year = data['years'].get('BAN')
-            indicator.india_year = data['years'].get('IND')
-            indicator.maldives_year = data['years'].get('MLD')
-            indicator.nepal_year = data['years'].get('NEP')
-            indicator.pakistan_year = data['years'].get('PAK')
-            indicator.sri_lanka_year = data['years'].get('LAK')
-            indicator.afghanistan_year_type = data['year_types'].get('AFG')
-            indicator.bangladesh_year_type = data['year_types'].get('BAN')
-            indicator.india_year_type = data['year_types'].get('IND')
-            indicator.maldives_year_type = data['year_types'].get('MLD')
-            indicator.nepal_year_type = data['year_types'].get('NEP')
-            indicator.pakistan_year_type = data['year_types'].get('PAK')
-            indicator.sri_lanka_year_type = data['year_types'].get('LAK')
-
-        session.commit()
+        values = indicator_values(data)
+        if config.WRITE_BEHIND:
+            ticket = write_behind_queue.enqueue(write_behind.INDICATOR, values)
+            return jsonify({"message": "Indicator save queued", "ticket": ticket}), 202
+
+        with metrics.query_phase():
+            # Fetch existing indicator
+            indicator = session.query(Indicator).filter_by(id=values['id']).first()
+
+            if not indicator:
+                # Create new indicator
+                session.add(Indicator(**values))
+            else:
+                # Update existing indicator
+                for column, value in values.items():
+                    setattr(indicator, column, value)
+
+            record_changes(session, INDICATOR, [values['id']])
+            session.commit()
+            after_indicators_saved([values['id']])
         return jsonify({"message": "Indicator saved successfully"}), 200
 
     except Exception as e:
@@ -191,6 +845,40 @@ def save_indicator():
         session.close()
 
 
+@app.route('/api/save_indicator/batch', methods=['POST'])
+def save_indicator_batch():
+    rows = request.json
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"error": "Expected a non-empty JSON array of indicators"}), 400
+    if len(rows) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch exceeds {MAX_BATCH_SIZE} rows"}), 400
+
+    with metrics.query_phase():
+        results, valid = validate_batch(rows, INDICATOR_REQUIRED_FIELDS, indicator_values, 'id')
+    if not valid:
+        return batch_response(results)
+
+    session = Session()
+    try:
+        with metrics.query_phase():
+            write_indicators(session, [values for _, values in valid])
+            session.commit()
+    except Exception as e:
+        session.rollback()
+        logging.error(f"Error saving indicator batch: {e}")
+        for result, _ in valid:
+            result.update(status='error', error=str(e))
+        return jsonify({"saved": 0, "failed": len(results), "results": results}), 500
+    finally:
+        session.close()
+
+    for result, _ in valid:
+        result['status'] = 'saved'
+    with metrics.query_phase():
+        after_indicators_saved([values['id'] for _, values in valid])
+    return batch_response(results)
+
+
 @app.route('/api/save_scorecard', methods=['POST'])
 def save_scorecard():
     session = Session()
@@ -198,55 +886,39 @@ def save_scorecard():
         data = request.json  # Get the JSON data from the POST request
 
         # Validation: Ensure required fields are present
-        required_fields = ['secondary_id', 'id', 'category_id', 'group_name', 'indicator', 'proxy', 'country', 'year',
-                           'year_type', 'source', 'value']
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = [field for field in SCORECARD_REQUIRED_FIELDS if field not in data]
         if missing_fields:
             return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}"}), 400
 
-        # Fetch existing ScoreCardIndicator2 by secondary_id if available
-        scorecard = session.query(ScoreCardIndicator2).filter_by(secondary_id=data['secondary_id']).first()
-
-        if not scorecard:
-            # If no scorecard exists, create a new one
-            scorecard = ScoreCardIndicator2(
-                secondary_id=data['secondary_id'],
-                id=data['id'],
-                category_id=data['category_id'],
-                group_name=data['group_name'],
-                indicator_name=data['indicator'],  # Updated field name
-                proxy=data['proxy'],
-                country=data['country'],
-                year=data['year'],
-                year_type=data['year_type'],
-                source=data['source'],
-                value=data['value'],
-                value_n=data.get('value_n'),
-                value_map=data.get('value_map'),
-                value_standardized=data.get('value_standardized'),
-                positive=data.get('positive'),
-                value_standardized_table=data.get('value_standardized_table')
-            )
-            session.add(scorecard)
-        else:
-            # Update existing scorecard
-            scorecard.id = data['id']  # Corrected key
-            scorecard.category_id = data['category_id']
-            scorecard.group_name = data['group_name']
-            scorecard.indicator_name = data['indicator']  # Updated field name
-            scorecard.proxy = data['proxy']
-            scorecard.country = data['country']
-            scorecard.year = data['year']
-            scorecard.year_type = data['year_type']
-            scorecard.source = data['source']
-            scorecard.value = data['value']
-            scorecard.value_n = data.get('value_n')
-            scorecard.value_map = data.get('value_map')
-            scorecard.value_standardized = data.get('value_standardized')
-            scorecard.positive = data.get('positive')
-            scorecard.value_standardized_table = data.get('value_standardized_table')
-
-        session.commit()  # Commit the changes to the database
+        values = scorecard_values(data)
+        if config.WRITE_BEHIND:
+            ticket = write_behind_queue.enqueue(write_behind.SCORECARD, values)
+            return jsonify({"message": "Scorecard save queued", "ticket": ticket}), 202
+
+        with metrics.query_phase():
+            # Fetch existing ScoreCardIndicator2 by secondary_id if available
+            scorecard = None
+            if values['secondary_id'] is not None:
+                scorecard = session.query(ScoreCardIndicator2).filter_by(secondary_id=values['secondary_id']).first()
+            previous_indicator = scorecard.indicator if scorecard else None
+            previous_id = scorecard.id if scorecard else None
+
+            if not scorecard:
+                # If no scorecard exists, create a new one (the database assigns a missing secondary_id)
+                if values['secondary_id'] is None:
+                    del values['secondary_id']
+                scorecard = ScoreCardIndicator2(**values)
+                session.add(scorecard)
+            else:
+                # Update existing scorecard
+                for column, value in values.items():
+                    setattr(scorecard, column, value)
+
+            session.flush()  # Assigns the secondary_id of a new row
+            record_changes(session, SCORECARD, [scorecard.secondary_id])
+            refresh_latest_values(session, {values['id'], previous_id})
+            session.commit()  # Commit the changes to the database
+            after_scorecards_saved([values['id']], {values['indicator'], previous_indicator})
         return jsonify({"message": "Scorecard saved successfully"}), 200
 
     except Exception as e:
@@ -257,6 +929,43 @@ def save_scorecard():
         session.close()  # Close the session after operation
 
 
+@app.route('/api/save_scorecard/batch', methods=['POST'])
+def save_scorecard_batch():
+    rows = request.json
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"error": "Expected a non-empty JSON array of scorecard values"}), 400
+    if len(rows) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch exceeds {MAX_BATCH_SIZE} rows"}), 400
+
+    with metrics.query_phase():
+        results, valid = validate_batch(rows, SCORECARD_REQUIRED_FIELDS, scorecard_values, 'secondary_id')
+    if not valid:
+        return batch_response(results)
+
+    session = Session()
+    try:
+        with metrics.query_phase():
+            inserted, touched_indicators = write_scorecards(session, [values for _, values in valid])
+            new_results = [result for result, values in valid if values['secondary_id'] is None]
+            for result, secondary_id in zip(new_results, inserted):
+                result['secondary_id'] = secondary_id
+            session.commit()
+    except Exception as e:
+        session.rollback()
+        logging.error(f"Error saving scorecard batch: {e}")
+        for result, _ in valid:
+            result.update(status='error', error=str(e))
+        return jsonify({"saved": 0, "failed": len(results), "results": results}), 500
+    finally:
+        session.close()
+
+    for result, _ in valid:
+        result['status'] = 'saved'
+    with metrics.query_phase():
+        after_scorecards_saved({values['id'] for _, values in valid}, touched_indicators)
+    return batch_response(results)
+
+
 if __name__ == "__main__":
     initialize_database()
     app.run(debug=True, use_reloader=False)
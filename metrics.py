@@ -0,0 +1,183 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds in seconds (phase durations) and statement counts
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                label_text = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+                prefix = f"{label_text}," if label_text else ''
+                label_set = f"{{{label_text}}}" if label_text else ''
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-2]}')
+                lines.append(f"{self.name}_count{label_set} {series[-2]}")
+                lines.append(f"{self.name}_sum{label_set} {series[-1]:.6f}")
+        return lines
+
+
+phase_seconds = Histogram('scorecard_request_phase_seconds',
+                          "Time spent per request phase (db, materialize, serialize, total).",
+                          ('endpoint', 'phase'), DURATION_BUCKETS)
+sql_statements = Histogram('scorecard_request_sql_statements',
+                           "SQL statements executed per request.",
+                           ('endpoint',), STATEMENT_BUCKETS)
+
+
+def _current():
+    """Timings for the current request (started on first use), or None outside a request."""
+    if not has_request_context():
+        return None
+    if 'request_metrics' not in g:
+        g.request_metrics = {'phases': {'db': 0.0}, 'statements': 0, 'started': time.perf_counter()}
+    return g.request_metrics
+
+
+def record_phase(name, seconds):
+    metrics = _current()
+    if metrics is not None:
+        metrics['phases'][name] = metrics['phases'].get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to the current request's ``name`` phase."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+
+
+@contextmanager
+def query_phase():
+    """Time a data loader, split into database time and Python-side materialization."""
+    metrics = _current()
+    db_before = metrics['phases']['db'] if metrics else 0.0
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            db_spent = metrics['phases']['db'] - db_before
+            record_phase('materialize', max(0.0, time.perf_counter() - started - db_spent))
+
+
+_END = object()
+
+
+def timed_query(iterable):
+    """
+    Yield from ``iterable``, timing each step like ``query_phase()``.
+
+    For streamed responses, whose rows are read while the body is sent.
+    """
+    iterator = iter(iterable)
+    while True:
+        with query_phase():
+            item = next(iterator, _END)
+        if item is _END:
+            return
+        yield item
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's execution context: one that raises leaves nothing
+    # behind on the pooled connection to be matched with a later statement
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    metrics = _current()
+    if metrics is not None and started is not None:
+        metrics['statements'] += 1
+        metrics['phases']['db'] += time.perf_counter() - started
+
+
+def _server_timing(metrics, total):
+    parts = []
+    for name, seconds in metrics['phases'].items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if name == 'db':
+            entry += f';desc="{metrics["statements"]} statements"'
+        parts.append(entry)
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ', '.join(parts)
+
+
+def _before_request():
+    _current()  # Start the clock; returning a value would short-circuit the request
+
+
+def _after_request(response):
+    metrics = _current()
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    response.headers['Server-Timing'] = _server_timing(metrics, time.perf_counter() - metrics['started'])
+
+    # Recorded once the body has been sent, so streamed responses include their
+    # streaming time; the header above can only cover the work done up front
+    def record():
+        total = time.perf_counter() - metrics['started']
+        for name, seconds in metrics['phases'].items():
+            phase_seconds.observe((endpoint, name), seconds)
+        phase_seconds.observe((endpoint, 'total'), total)
+        sql_statements.observe((endpoint,), metrics['statements'])
+
+    response.call_on_close(record)
+    return response
+
+
+def render(extra_metrics=()):
+    """
+    Prometheus text exposition of the histograms plus ``(name, help, value)`` metrics.
+
+    Metrics named ``*_total`` are declared as counters, the rest as gauges.
+    """
+    lines = phase_seconds.render() + sql_statements.render()
+    for name, help_text, value in extra_metrics:
+        if value is None:
+            continue
+        metric_type = 'counter' if name.endswith('_total') else 'gauge'
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {value}"]
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Attach the per-request timing hooks to ``app`` and SQL counting to every engine."""
+    # Listening on the Engine class covers engines created later, on first use (see db.get_engine)
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
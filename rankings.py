@@ -0,0 +1,143 @@
+import logging
+import threading
+
+from sqlalchemy import select
+
+from cache import snapshot_cache
+from Classes.ScorecardChart import ScoreCardChart
+from db import Session
+
+# Aggregate rows are shown on the chart but never ranked against countries
+REGIONAL_AGGREGATES = ("South Asia Region", "SARw/oIndia")
+SORT_OPTIONS = ('year', 'country')
+
+
+def _assign_ranks(entries):
+    # Highest table score first; missing scores rank last
+    entries.sort(key=lambda entry: (entry['value'] is None, -(entry['value'] or 0)))
+    for index, entry in enumerate(entries):
+        entry['rank'] = index + 1
+        entry['totalInGroup'] = len(entries)
+
+
+def compute_rankings(rows):
+    """
+    Rank scorecard rows the same way ``calculateRankings()`` in radarChart.js does.
+
+    Returns ``{indicator: {sort_option: {key: [entry, ...]}}}`` where the keys match
+    the client's ``globalData.rankings`` keys: ``"<Indicator>_<Year_Type>"`` for the
+    'year' sort and ``"<Indicator>_<Country>"`` for the 'country' sort.
+    """
+    rankings = {}
+    for row in rows:
+        if row.country in REGIONAL_AGGREGATES or row.value_standardized is None:
+            continue
+        by_sort = rankings.setdefault(row.indicator, {option: {} for option in SORT_OPTIONS})
+        for option in SORT_OPTIONS:
+            key = f"{row.indicator}_{row.year_type}" if option == 'year' else f"{row.indicator}_{row.country}"
+            by_sort[option].setdefault(key, []).append({
+                'country': row.country,
+                'yearType': row.year_type,
+                'indicator': row.indicator,
+                'secondaryId': row.secondary_id,
+                'value': row.value_standardized_table,
+            })
+
+    for by_sort in rankings.values():
+        for groups in by_sort.values():
+            for entries in groups.values():
+                _assign_ranks(entries)
+    return rankings
+
+
+class RankingStore:
+    """
+    Materialized rankings for every indicator, built once per data version from ``ScoreCardChart``.
+
+    Any save, here or in another worker (see ``SnapshotCache.follow()``), moves
+    ``snapshot_cache.version`` on, and the next read rebuilds everything. After a
+    save in this worker, ``refresh_indicator()`` recomputes just the indicators
+    it touched instead, when nothing else changed in between.
+    """
+
+    def __init__(self):
+        self._by_indicator = None
+        self._version = None
+        self._merged = {}
+        self._lock = threading.Lock()
+
+    def get(self, sort_option, indicator=None, year_type=None):
+        """Return ``{key: [entry, ...]}`` for a sort option, optionally filtered."""
+        if sort_option not in SORT_OPTIONS:
+            raise ValueError(f"Unknown sort option '{sort_option}'")
+        with self._lock:
+            version = snapshot_cache.version
+            if self._by_indicator is None or self._version != version:
+                self._rebuild(version)
+            if indicator is not None:
+                groups = self._by_indicator.get(indicator, {}).get(sort_option, {})
+            else:
+                groups = self._merged_view(sort_option)
+
+        if year_type is None:
+            return groups
+        filtered = {}
+        for key, entries in groups.items():
+            matching = [entry for entry in entries if entry['yearType'] == year_type]
+            if matching:
+                filtered[key] = matching
+        return filtered
+
+    def refresh_indicator(self, version, *indicators):
+        """
+        Recompute rankings for the given indicator names after a write bumped the data to ``version``.
+
+        Only done when the rankings were current as of the version just before;
+        otherwise other changes are missing too and the next read rebuilds everything.
+        """
+        with self._lock:
+            if self._by_indicator is None or self._version != version - 1:
+                return
+            session = Session()
+            try:
+                names = [name for name in set(indicators) if name]
+                table = ScoreCardChart.__table__
+                rows = session.execute(select(table).where(table.c.indicator.in_(names)))
+                fresh = compute_rankings(rows)
+                for name in names:
+                    if name in fresh:
+                        self._by_indicator[name] = fresh[name]
+                    else:
+                        self._by_indicator.pop(name, None)
+                self._merged = {}
+                self._version = version
+            except Exception as e:
+                logging.error(f"Error refreshing rankings: {e}")
+                self._by_indicator = None  # Force a full rebuild on the next read
+            finally:
+                session.close()
+
+    def invalidate(self):
+        """Drop everything; the next read rebuilds all indicators."""
+        with self._lock:
+            self._by_indicator = None
+
+    def _rebuild(self, version):
+        session = Session()
+        try:
+            self._by_indicator = compute_rankings(session.execute(select(ScoreCardChart.__table__)))
+            self._merged = {}
+            self._version = version
+        finally:
+            session.close()
+
+    def _merged_view(self, sort_option):
+        if sort_option not in self._merged:
+            merged = {}
+            for by_sort in self._by_indicator.values():
+                merged.update(by_sort[sort_option])
+            self._merged[sort_option] = merged
+        return self._merged[sort_option]
+
+
+ranking_store = RankingStore()
@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional: payloads are only gzip-compressed without it
+    brotli = None
+
+# Smaller bodies are sent as they are; compressing them saves less than the headers cost
+COMPRESS_MIN_BYTES = 1024
+
+
+def dumps(obj):
+    """Serialize ``obj`` to compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+class Payload:
+    """
+    A serialized response body with a strong ETag and its compressed copies.
+
+    Cached in place of the bare body, so each encoding is compressed at most once
+    per data change rather than once per request. ``headers`` are sent with
+    every response built from it.
+    """
+
+    def __init__(self, body, headers=None):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.headers = headers or {}
+        self._encoded = {}
+
+    def encodings(self):
+        """Content codings this payload can be sent in, preferred first."""
+        if len(self.body) < COMPRESS_MIN_BYTES:
+            return ()
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def encoded(self, encoding):
+        """The body compressed with ``encoding`` ('br' or 'gzip'), compressed on first use."""
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == 'br':
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=6, mtime=0)
+            self._encoded[encoding] = data  # Two requests racing here both compress; either copy is fine
+        return data
+
+    def variant_etag(self, encoding):
+        """Strong ETag of the representation sent with ``encoding`` (``None`` for the plain body)."""
+        return self.etag if encoding is None else f"{self.etag}-{encoding}"
+
+
+def to_columnar(rows, dictionary_threshold=0.5):
+    """
+    Convert a list of row dicts into a columnar payload.
+
+    String columns with few distinct values (at most ``dictionary_threshold`` of the
+    row count) are dictionary-encoded as ``{"values": [...], "codes": [...]}``; every
+    other column is a plain array. The dashboard's grouped chart data carries its
+    rows in this form; ``decodeColumnar()`` in radarChart.js reverses it.
+    """
+    columns = list(rows[0].keys()) if rows else []
+    encoded = {}
+    for name in columns:
+        values = [row[name] for row in rows]
+        if all(value is None or isinstance(value, str) for value in values):
+            table = {}
+            codes = [table.setdefault(value, len(table)) for value in values]
+            if len(table) <= dictionary_threshold * len(values):
+                encoded[name] = {'values': list(table), 'codes': codes}
+                continue
+        encoded[name] = values
+    return {
+        'format': 'columnar',
+        'length': len(rows),
+        'columns': encoded,
+        'order': columns,
+    }
@@ -0,0 +1,405 @@
+"""
+Read-only snapshot of the scorecard tables shared by every gunicorn worker.
+
+``scorecard_indicators3`` and ``indicators_revised`` are written to one binary
+file. Numeric columns are stored as fixed-width arrays, and each string column
+as int32 codes into its own sorted string dictionary. Workers ``mmap`` the file
+read-only, so the page cache holds a single copy of the data and each worker
+only decodes the strings it actually serves. After a save, one worker rebuilds
+the file in the background and atomically replaces it. The other workers see
+the new inode on their next request and remap it.
+
+File layout (all blocks 8-byte aligned, little-endian)::
+
+    b'SCSNAP01' | uint64 header length | JSON header | column blocks...
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import Boolean, Float, Integer, select
+
+import config
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; concurrent rebuilds then rely on the version check alone
+    fcntl = None
+
+MAGIC = b'SCSNAP01'
+INT_NULL = np.iinfo(np.int64).min
+BOOL_NULL = -1
+
+
+def _tables():
+    from Classes.Indicator import Indicator
+    from Classes.ScorecardValues import ScoreCardIndicator2
+    return [ScoreCardIndicator2.__table__, Indicator.__table__]
+
+
+def _column_kind(column):
+    if isinstance(column.type, Boolean):
+        return 'bool'
+    if isinstance(column.type, Integer):
+        return 'int'
+    if isinstance(column.type, Float):
+        return 'float'
+    return 'str'
+
+
+def _encode_column(kind, values):
+    """Return the byte blocks for one column: ``[data]`` or ``[codes, offsets, blob]`` for strings."""
+    if kind == 'int':
+        return [np.array([INT_NULL if value is None else value for value in values], dtype='<i8').tobytes()]
+    if kind == 'float':
+        return [np.array([np.nan if value is None else value for value in values], dtype='<f8').tobytes()]
+    if kind == 'bool':
+        return [np.array([BOOL_NULL if value is None else int(value) for value in values], dtype='<i1').tobytes()]
+
+    dictionary = sorted({value for value in values if value is not None})
+    codes = {value: code for code, value in enumerate(dictionary)}
+    encoded = [value.encode('utf-8') for value in dictionary]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return [
+        np.array([-1 if value is None else codes[value] for value in values], dtype='<i4').tobytes(),
+        offsets.tobytes(),
+        b''.join(encoded),
+    ]
+
+
+def write_snapshot(path, session):
+    """
+    Write both tables to ``path`` atomically; returns the snapshot's change version.
+
+    The change-log version is read before the rows, so the snapshot is at least as
+    new as the version it is labelled with. If a newer snapshot was written
+    meanwhile, by another worker, it is kept and this one discarded.
+    """
+    from Classes.ChangeLog import latest_version
+
+    version = latest_version(session)
+    header = {'version': version, 'created_at': time.time(), 'tables': {}}
+    blocks = []
+    position = 0
+
+    def add_block(data):
+        nonlocal position
+        offset = position
+        blocks.append(data)
+        position += len(data)
+        padding = -position % 8
+        if padding:
+            blocks.append(b'\0' * padding)
+            position += padding
+        return offset
+
+    for table in _tables():
+        rows = session.execute(select(table).order_by(*table.primary_key.columns)).all()
+        columns = []
+        for index, column in enumerate(table.columns):
+            kind = _column_kind(column)
+            encoded = _encode_column(kind, [row[index] for row in rows])
+            spec = {'name': column.name, 'kind': kind, 'offset': add_block(encoded[0])}
+            if kind == 'str':
+                spec['dictionary_size'] = len(encoded[1]) // 8 - 1
+                spec['offsets'] = add_block(encoded[1])
+                spec['blob'] = add_block(encoded[2])
+            columns.append(spec)
+        header['tables'][table.name] = {
+            'length': len(rows),
+            'primary_key': [column.name for column in table.primary_key.columns],
+            'columns': columns,
+        }
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-(len(MAGIC) + 8 + len(header_bytes)) % 8)
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        os.chmod(temporary, 0o644)
+        with os.fdopen(descriptor, 'wb') as output:
+            output.write(MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes)
+            for block in blocks:
+                output.write(block)
+            output.flush()
+            os.fsync(output.fileno())
+
+        with open(f"{path}.lock", 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            current = read_version(path)
+            if current is not None and current > version:
+                os.unlink(temporary)
+                return current
+            os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return version
+
+
+def _read_header(buffer):
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a scorecard snapshot")
+    (length,) = struct.unpack_from('<Q', buffer, len(MAGIC))
+    start = len(MAGIC) + 8
+    return json.loads(bytes(buffer[start:start + length])), start + length
+
+
+def read_version(path):
+    """Change version of the snapshot at ``path``, or ``None`` if there is none."""
+    try:
+        with open(path, 'rb') as snapshot_file:
+            prefix = snapshot_file.read(len(MAGIC) + 8)
+            (length,) = struct.unpack_from('<Q', prefix, len(MAGIC))
+            header, _ = _read_header(prefix + snapshot_file.read(length))
+        return header['version']
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+class SnapshotColumn:
+    def __init__(self, buffer, base, length, spec):
+        self.name = spec['name']
+        self.kind = spec['kind']
+        dtype = {'int': '<i8', 'float': '<f8', 'bool': '<i1', 'str': '<i4'}[self.kind]
+        self.data = np.frombuffer(buffer, dtype=dtype, count=length, offset=base + spec['offset'])
+        if self.kind == 'str':
+            size = spec['dictionary_size']
+            self._offsets = np.frombuffer(buffer, dtype='<u8', count=size + 1, offset=base + spec['offsets'])
+            self._blob_start = base + spec['blob']
+            self._buffer = buffer
+            self._size = size
+            self._decoded = {}
+
+    def string(self, code):
+        value = self._decoded.get(code)
+        if value is None:
+            start, end = int(self._offsets[code]), int(self._offsets[code + 1])
+            value = bytes(self._buffer[self._blob_start + start:self._blob_start + end]).decode('utf-8')
+            self._decoded[code] = value
+        return value
+
+    def code_of(self, value):
+        """Dictionary code of ``value`` (binary search over the sorted dictionary), or -2 if absent."""
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(middle) < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self._size and self.string(low) == value else -2
+
+    def equals(self, value):
+        """Boolean mask of the rows whose value is ``value``."""
+        if self.kind == 'str':
+            return self.data == self.code_of(value)
+        return self.data == value
+
+    def values(self, indices):
+        """Python values at ``indices``, with ``None`` for NULL."""
+        raw = self.data[indices]
+        if self.kind == 'str':
+            return [None if code < 0 else self.string(code) for code in raw.tolist()]
+        if self.kind == 'int':
+            return [None if value == INT_NULL else value for value in raw.tolist()]
+        if self.kind == 'bool':
+            return [None if value == BOOL_NULL else bool(value) for value in raw.tolist()]
+        return [None if value != value else value for value in raw.tolist()]
+
+
+class SnapshotTable:
+    def __init__(self, name, buffer, base, spec):
+        self.name = name
+        self.length = spec['length']
+        self.primary_key = spec['primary_key']
+        self.columns = {column['name']: SnapshotColumn(buffer, base, self.length, column)
+                        for column in spec['columns']}
+        self.Row = namedtuple(f"{name}_row", list(self.columns), rename=True)
+
+    def select(self, after=None, order_by=None, limit=None, not_null=(), one_of=None, **equal):
+        """
+        Row indices matching every ``column=value`` in ``equal`` (``None`` values
+        are ignored), with non-NULL ``not_null`` columns and, for ``one_of=(column,
+        values)``, a value in ``values``. ``after`` is a keyset cursor on the first
+        ``order_by`` column. Rows are in primary-key order unless ``order_by`` lists
+        columns.
+        """
+        mask = np.ones(self.length, dtype=bool)
+        for name, value in equal.items():
+            if value is not None:
+                mask &= self.columns[name].equals(value)
+        for name in not_null:
+            mask &= self.columns[name].data != INT_NULL
+        if one_of is not None:
+            name, values = one_of
+            mask &= np.isin(self.columns[name].data, np.fromiter(values, dtype=np.int64))
+        if after is not None:
+            mask &= self.columns[order_by[0]].data > after
+        indices = np.flatnonzero(mask)
+        if order_by and list(order_by) != self.primary_key:  # Stored in primary-key order already
+            keys = [self.columns[name].data[indices] for name in reversed(order_by)]
+            indices = indices[np.lexsort(keys)]
+        if limit is not None:
+            indices = indices[:limit]
+        return indices
+
+    def fetch(self, indices=None, columns=None):
+        """Rows at ``indices`` (all rows by default) as tuples of ``columns`` (named rows by default)."""
+        if indices is None:
+            indices = np.arange(self.length)
+        if columns is None:
+            return [self.Row._make(row) for row in zip(*(column.values(indices) for column in self.columns.values()))]
+        return list(zip(*(self.columns[name].values(indices) for name in columns))) if len(indices) else []
+
+
+class Snapshot:
+    def __init__(self, path):
+        with open(path, 'rb') as snapshot_file:
+            self.inode = os.fstat(snapshot_file.fileno()).st_ino
+            self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        header, base = _read_header(self._map)
+        self.version = header['version']
+        self.created_at = header['created_at']
+        self.tables = {name: SnapshotTable(name, self._map, base, spec) for name, spec in header['tables'].items()}
+
+    def table(self, name):
+        return self.tables[name]
+
+
+class SharedSnapshotStore:
+    """
+    The current snapshot for this worker plus a background rebuilder.
+
+    ``current()`` returns the mapped snapshot or ``None`` (disabled, not built
+    yet, or stale after a save in this worker), in which case callers read from
+    the database. ``schedule_rebuild()`` coalesces rebuild requests: saves made
+    while a rebuild runs trigger one more rebuild. The rebuilder also checks
+    the change log every ``check_seconds`` so saves made on other instances,
+    which write to their own snapshot file, are picked up.
+    """
+
+    def __init__(self, path, enabled, check_seconds):
+        self.path = path
+        self.enabled = enabled
+        self.check_seconds = check_seconds
+        self._snapshot = None
+        self._stale = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.rebuilds = 0
+        self.remaps = 0
+
+    def refresh(self):
+        """Map a newer snapshot file if one was written; returns True if the data changed."""
+        if not self.enabled:
+            return False
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            self.schedule_rebuild()
+            return False
+        if self._snapshot is not None and self._snapshot.inode == inode:
+            return False
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.inode == inode:
+                return False
+            try:
+                snapshot = Snapshot(self.path)
+            except (OSError, ValueError) as e:
+                logging.error(f"Error mapping snapshot {self.path}: {e}")
+                return False
+            # The previous mapping is released once no reader still holds its arrays
+            self._snapshot = snapshot
+            self._stale = False
+            self.remaps += 1
+        return True
+
+    def current(self):
+        from db import primary_pinned
+        # Requests pinned to the primary must see their client's own write, which the snapshot may predate
+        if not self.enabled or self._stale or primary_pinned():
+            return None
+        return self._snapshot
+
+    def mark_stale(self):
+        """Read from the database until the rebuild after this worker's save is mapped."""
+        if self.enabled:
+            self._stale = True
+            self.schedule_rebuild()
+
+    def schedule_rebuild(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is None:
+                # Started on first use, so each gunicorn worker gets its own thread after forking
+                self._thread = threading.Thread(target=self._run, name='snapshot-rebuild', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def rebuild(self):
+        """Write a fresh snapshot now and map it; returns its version."""
+        from db import Session, use_primary
+        session = Session()
+        use_primary(session)  # Rebuilt right after saves, so read what they committed
+        try:
+            version = write_snapshot(self.path, session)
+        finally:
+            session.close()
+            Session.remove()
+        self.rebuilds += 1
+        self.refresh()
+        with self._lock:
+            # When another worker had already written a newer snapshot, ours was discarded and
+            # that file may be mapped already, so refresh() did not clear the stale flag
+            if self._snapshot is not None and self._snapshot.version >= version:
+                self._stale = False
+        return version
+
+    def _run(self):
+        from db import Session
+        from Classes.ChangeLog import latest_version
+        while True:
+            woken = self._wake.wait(self.check_seconds)
+            self._wake.clear()
+            try:
+                if not woken and self._snapshot is not None:
+                    session = Session()
+                    try:
+                        behind = latest_version(session) > self._snapshot.version
+                    finally:
+                        session.close()
+                        Session.remove()
+                    if not behind:
+                        continue
+                self.rebuild()
+            except Exception as e:
+                logging.error(f"Error rebuilding snapshot: {e}")
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'enabled': self.enabled,
+            'path': self.path,
+            'version': snapshot.version if snapshot else None,
+            'created_at': snapshot.created_at if snapshot else None,
+            'stale': self._stale,
+            'rows': {name: table.length for name, table in snapshot.tables.items()} if snapshot else None,
+            'rebuilds': self.rebuilds,
+            'remaps': self.remaps,
+        }
+
+
+shared_snapshot = SharedSnapshotStore(config.SNAPSHOT_PATH, config.SNAPSHOT_ENABLED, config.SNAPSHOT_CHECK_SECONDS)
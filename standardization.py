@@ -0,0 +1,150 @@
+import logging
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+
+from Classes.ChangeLog import ALL, INDICATOR, record_changes
+from Classes.Indicator import Indicator
+from Classes.LatestValue import refresh_latest_values
+from Classes.ScorecardValues import ScoreCardIndicator2
+from db import Session, use_primary
+from rankings import REGIONAL_AGGREGATES
+
+
+def parse_numeric(value):
+    """Parse stored values such as '1,234.5' or '45%' into a float (NaN if not numeric)."""
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '').replace('%', '').strip())
+    except ValueError:
+        return np.nan
+
+
+def compute_scores(groups, values, is_country, positive):
+    """
+    Standardize ``values`` within each group in one vectorized pass.
+
+    ``groups`` holds a 0-based group code per row (one group per indicator, so all
+    countries and year types share the same axis on the radar chart). Only country
+    rows with a value define each group's range; regional aggregates are scored
+    on the same scale.
+
+    Returns ``(standardized, table)``:
+
+    * ``standardized`` is min-max scaled to 0..100 (the radar chart axis), with
+      50 when every country has the same value;
+    * ``table`` is the deviation from the group mean scaled by the largest absolute
+      deviation to -100..100 (the table colour scale), 0 when there is no spread.
+
+    Both are flipped where ``positive`` is False, so higher is always better. Rows
+    without a value, or in a group without country values, get NaN.
+    """
+    groups = np.asarray(groups, dtype=np.intp)
+    values = np.asarray(values, dtype=float)
+    positive = np.asarray(positive, dtype=bool)
+    group_count = int(groups.max()) + 1 if groups.size else 0
+
+    defined = np.asarray(is_country, dtype=bool) & ~np.isnan(values)
+    low = np.full(group_count, np.inf)
+    high = np.full(group_count, -np.inf)
+    np.minimum.at(low, groups[defined], values[defined])
+    np.maximum.at(high, groups[defined], values[defined])
+    counts = np.bincount(groups[defined], minlength=group_count)
+    totals = np.bincount(groups[defined], weights=values[defined], minlength=group_count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = totals / counts
+
+    deviation = values - means[groups]
+    max_deviation = np.zeros(group_count)
+    np.maximum.at(max_deviation, groups[defined], np.abs(deviation[defined]))
+
+    span = (high - low)[groups]
+    spread = max_deviation[groups]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        standardized = np.where(span > 0, 100 * (values - low[groups]) / span, 50.0)
+        table = np.where(spread > 0, 100 * deviation / spread, 0.0)
+
+    standardized = np.clip(np.where(positive, standardized, 100 - standardized), 0, 100)
+    table = np.clip(np.where(positive, table, -table), -100, 100) + 0.0  # no negative zeros
+
+    missing = np.isnan(values) | (counts[groups] == 0)
+    standardized[missing] = np.nan
+    table[missing] = np.nan
+    return standardized, table
+
+
+def standardize_indicators(indicator_ids=None):
+    """
+    Recompute standardized scores for the given indicators (all when ``None``).
+
+    Reads the values with one query per table, scores them with
+    ``compute_scores()`` and writes ``value_standardized``,
+    ``value_standardized_table``, ``positive`` and ``percent_number`` back with a
+    single executemany UPDATE, logged as indicator-level changes in the same
+    transaction. Returns the number of rows updated.
+    """
+    scorecards = ScoreCardIndicator2.__table__
+    indicators = Indicator.__table__
+
+    session = Session()
+    use_primary(session)  # Values are read back and rewritten in one transaction
+    try:
+        indicator_query = select(indicators.c.id, indicators.c.positive_negative_indicator,
+                                 indicators.c.number_percent)
+        value_query = select(scorecards.c.secondary_id, scorecards.c.id, scorecards.c.country,
+                             scorecards.c.value, scorecards.c.value_n).where(scorecards.c.id.isnot(None))
+        if indicator_ids is not None:
+            indicator_query = indicator_query.where(indicators.c.id.in_(indicator_ids))
+            value_query = value_query.where(scorecards.c.id.in_(indicator_ids))
+
+        settings = {row.id: row for row in session.execute(indicator_query)}
+        rows = [row for row in session.execute(value_query) if row.id in settings]
+        if not rows:
+            return 0
+
+        _, groups = np.unique(np.array([row.id for row in rows]), return_inverse=True)
+        # value_n holds the numeric form when the display value is formatted
+        values = np.array([parse_numeric(row.value_n if row.value_n not in (None, '') else row.value)
+                           for row in rows])
+        is_country = np.array([row.country not in REGIONAL_AGGREGATES for row in rows])
+        positive = np.array([settings[row.id].positive_negative_indicator is not False for row in rows])
+        standardized, table = compute_scores(groups, values, is_country, positive)
+
+        statement = (
+            update(scorecards)
+            .where(scorecards.c.secondary_id == bindparam('row_id'))
+            .values(
+                value_standardized=bindparam('standardized'),
+                value_standardized_table=bindparam('table'),
+                positive=bindparam('row_positive'),
+                percent_number=bindparam('row_percent'),
+            )
+        )
+        params = [
+            {
+                'row_id': row.secondary_id,
+                'standardized': None if np.isnan(standardized[index]) else round(float(standardized[index]), 4),
+                'table': None if np.isnan(table[index]) else round(float(table[index]), 4),
+                'row_positive': bool(positive[index]),
+                'row_percent': settings[row.id].number_percent,
+            }
+            for index, row in enumerate(rows)
+        ]
+        session.connection().execute(statement, params)
+        if indicator_ids is None:
+            record_changes(session, ALL)
+            refresh_latest_values(session)
+        else:
+            record_changes(session, INDICATOR, sorted({row.id for row in rows}))
+            refresh_latest_values(session, {row.id for row in rows})
+        session.commit()
+        return len(params)
+    except Exception as e:
+        session.rollback()
+        logging.error(f"Error standardizing indicators: {e}")
+        raise
+    finally:
+        session.close()
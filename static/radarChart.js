@@ -9,6 +9,7 @@ let countryYearTypes = {}; // Map of country to available year types
 let mostRecentSelection = null; // Keep track of the most recent selection
 let showRadarValues = false; // Flag to toggle the display of radar values
 let tableSortOption = 'indicator'; // Default sorting by indicator
+let serverRankings = {}; // Rankings from /api/rankings, keyed by sort option
 tableSortOption = 'year'; // Set default sort option to 'year'
 
 
@@ -161,48 +162,223 @@ function calculateRankings(data, sortOption) {
     return rankings;
 }
 
-// Fetching the data from the API and organizing it by Group_Name, Country, and Year
-async function fetchData() {
+// Whether every country and year type is selected, so that the server's rankings,
+// which rank across all of them, match what calculateRankings() would give
+function selectionCoversAllData() {
+    return Object.entries(countryYearTypes).every(([country, yearTypes]) => {
+        if (country === "South Asia Region" || country === "SARw/oIndia") return true;
+        const selected = new Set(Array.from(selectedCountryYears[country] || [], Number));
+        return Array.from(yearTypes).every(yearType => selected.has(Number(yearType)));
+    });
+}
+
+// Fetch the precomputed rankings for both sort options from the server
+async function fetchRankings() {
+    await Promise.all(['year', 'country'].map(async sortOption => {
+        try {
+            const response = await fetch(`/api/rankings?sort=${sortOption}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! Status: ${response.status}`);
+            }
+            serverRankings[sortOption] = await response.json();
+        } catch (error) {
+            // filterData() falls back to calculateRankings() for this sort option
+            console.error(`Error fetching ${sortOption} rankings:`, error);
+        }
+    }));
+}
+
+// Decode a columnar payload from /api/scorecard_chart?format=columnar into row objects
+function decodeColumnar(payload) {
+    const columns = payload.order.map(name => [name, payload.columns[name]]);
+    const rows = new Array(payload.length);
+    for (let i = 0; i < payload.length; i++) {
+        const row = {};
+        columns.forEach(([name, column]) => {
+            // Dictionary-encoded string columns carry a value table and integer codes
+            row[name] = Array.isArray(column) ? column[i] : column.values[column.codes[i]];
+        });
+        rows[i] = row;
+    }
+    return rows;
+}
+
+const SCORECARD_STORAGE_KEY = 'scorecardChartGrouped';
+let scorecardData = null; // The grouped payload behind globalData
+let scorecardVersion = null; // Change-log version scorecardData is current to
+
+function hasStandardizedValue(row) {
+    return row.Value_Standardized !== null && !isNaN(row.Value_Standardized);
+}
+
+// Expand /api/scorecard_chart/grouped?format=columnar, whose globalData holds
+// indices into its columnar rows, into the grouped shape with row objects
+function expandGroupedColumnar(payload) {
+    const rows = decodeColumnar(payload.rows);
+    const globalData = {};
+    Object.entries(payload.globalData).forEach(([groupName, countries]) => {
+        const group = globalData[groupName] = {};
+        Object.entries(countries).forEach(([country, yearTypes]) => {
+            const byYearType = group[country] = {};
+            Object.entries(yearTypes).forEach(([yearType, indices]) => {
+                byYearType[yearType] = indices.map(index => rows[index]);
+            });
+        });
+    });
+    return { globalData, countryYearTypes: payload.countryYearTypes, allIndicators: payload.allIndicators };
+}
+
+// Add rows to a grouped payload: Group_Name -> Country -> Year_Type -> rows
+function addScorecardRows(grouped, rows) {
+    const indicators = new Set(grouped.allIndicators);
+    rows.forEach(row => {
+        const { Group_Name, Country, Year_Type } = row;
+        const group = grouped.globalData[Group_Name] || (grouped.globalData[Group_Name] = {});
+        const country = group[Country] || (group[Country] = {});
+        const yearType = country[Year_Type] || (country[Year_Type] = []);
+        if (hasStandardizedValue(row)) {
+            yearType.push(row);
+        }
+        const yearTypes = grouped.countryYearTypes[Country] || (grouped.countryYearTypes[Country] = []);
+        if (!yearTypes.includes(Year_Type)) {
+            yearTypes.push(Year_Type);
+        }
+        indicators.add(row.Indicator);
+    });
+    grouped.allIndicators = Array.from(indicators).sort();
+}
+
+// Patch a grouped payload in place with a /api/scorecard_chart?since= delta;
+// null for a reset, after which the grouped data is downloaded again
+function applyScorecardChanges(grouped, changes) {
+    if (changes.reset) {
+        return null;
+    }
+    const replaced = new Set(changes.deleted.concat(changes.rows.map(row => row.Secondary_ID)));
+    if (replaced.size === 0) {
+        return grouped;
+    }
+    Object.entries(grouped.globalData).forEach(([groupName, countries]) => {
+        if (groupName === 'rankings') {
+            return; // Added to the live globalData by filterData, not a group
+        }
+        Object.values(countries).forEach(yearTypes => {
+            Object.keys(yearTypes).forEach(yearType => {
+                yearTypes[yearType] = yearTypes[yearType].filter(row => !replaced.has(row.Secondary_ID));
+            });
+        });
+    });
+    addScorecardRows(grouped, changes.rows);
+    return grouped;
+}
+
+// Load the grouped scorecard data, reusing the copy kept in localStorage when there
+// is one: returning visitors only download the rows changed since their stored version
+async function loadScorecardData() {
+    let stored = null;
     try {
-        console.log("Fetching data from API...");
-        const response = await fetch('/api/scorecard_chart');
+        stored = JSON.parse(localStorage.getItem(SCORECARD_STORAGE_KEY));
+    } catch (error) {
+        stored = null;
+    }
 
+    let grouped = null;
+    let version;
+    if (stored && stored.grouped) {
+        const response = await fetch(`/api/scorecard_chart?since=${stored.version}&format=columnar`);
         if (!response.ok) {
             throw new Error(`HTTP error! Status: ${response.status}`);
         }
-
-        const data = await response.json();
-        console.log("API Response Data:", data);
-
-        if (!Array.isArray(data)) {
-            throw new Error('The fetched data is not an array.');
+        const changes = await response.json();
+        changes.rows = decodeColumnar(changes.rows);
+        version = changes.version;
+        grouped = applyScorecardChanges(stored.grouped, changes);
+    }
+    if (grouped === null) {
+        // Grouped on the server; columnar so each key and Group_Name/Country string is sent once
+        const response = await fetch('/api/scorecard_chart/grouped?format=columnar');
+        if (!response.ok) {
+            throw new Error(`HTTP error! Status: ${response.status}`);
         }
+        version = Number(response.headers.get('X-Change-Version'));
+        grouped = expandGroupedColumnar(await response.json());
+    }
 
-        globalData = {}; // Initialize the globalData object
-        countryYearTypes = {}; // Initialize countryYearTypes
+    if (stored === null || version !== stored.version) {
+        storeScorecardData(version, grouped);
+    }
+    scorecardVersion = version;
+    return grouped;
+}
 
-        // Store the complete original objects
-        data.forEach((scorecardItem) => {
-            const { Group_Name, Country, Year_Type } = scorecardItem;
+function storeScorecardData(version, grouped) {
+    try {
+        localStorage.setItem(SCORECARD_STORAGE_KEY, JSON.stringify({ version, grouped }, function (key, value) {
+            return this === grouped.globalData && key === 'rankings' ? undefined : value;
+        }));
+    } catch (error) {
+        // Storage full or disabled: the next visit does a full download again
+        localStorage.removeItem(SCORECARD_STORAGE_KEY);
+    }
+}
 
-            const group = globalData[Group_Name] || (globalData[Group_Name] = {});
-            const country = group[Country] || (group[Country] = {});
-            const yearType = country[Year_Type] || (country[Year_Type] = []);
+// Make a grouped payload the data behind the charts and table
+function useScorecardData(grouped) {
+    scorecardData = grouped;
+    globalData = grouped.globalData;
+    countryYearTypes = {};
+    Object.entries(grouped.countryYearTypes).forEach(([country, yearTypes]) => {
+        countryYearTypes[country] = new Set(yearTypes);
+    });
+    allIndicators = grouped.allIndicators;
+}
 
-            if (scorecardItem.Value_Standardized !== null && !isNaN(scorecardItem.Value_Standardized)) {
-                // Store the entire original object
-                yearType.push(scorecardItem);
+// Follow /api/events and patch globalData in place as scorecard values are saved.
+// EventSource reconnects by itself, resuming after the last event it received,
+// but gives up on an error status such as the 503 of a worker with no free stream.
+function subscribeToScorecardChanges() {
+    if (typeof EventSource === 'undefined' || scorecardVersion === null) {
+        return;
+    }
+    const source = new EventSource(`/api/events?since=${scorecardVersion}`);
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(subscribeToScorecardChanges, 30000 + Math.random() * 30000);
+        }
+    };
+    source.addEventListener('scorecard', async event => {
+        const changes = JSON.parse(event.data);
+        if (changes.version <= scorecardVersion) {
+            return;
+        }
+        try {
+            if (changes.reset) {
+                // Too far behind for a delta: reload like a returning visit
+                useScorecardData(await loadScorecardData());
+            } else {
+                applyScorecardChanges(scorecardData, changes);
+                useScorecardData(scorecardData);
+                scorecardVersion = changes.version;
+                storeScorecardData(scorecardVersion, scorecardData);
             }
+            await fetchRankings();
+            filterData();
+        } catch (error) {
+            console.error('Error applying scorecard changes:', error);
+        }
+    });
+}
 
-            // Collect available year types per country
-            if (!countryYearTypes[Country]) {
-                countryYearTypes[Country] = new Set();
-            }
-            countryYearTypes[Country].add(Year_Type);
-        });
+// Fetching the data from the API, already organized by Group_Name, Country, and Year
+async function fetchData() {
+    try {
+        console.log("Fetching data from API...");
+        const grouped = await loadScorecardData();
+        console.log("API Response Data:", grouped);
 
-        // Populate allIndicators with unique indicators
-        allIndicators = Array.from(new Set(data.map(d => d.Indicator))).sort();
+        useScorecardData(grouped);
+
+        await fetchRankings();
 
         createCategoryButtons();
         populateFlagSelections();
@@ -307,7 +483,12 @@ function populateFlagSelections() {
         flagImageContainer.classList.add("flag-image-container");
 
         const flagImage = document.createElement("img");
-        flagImage.src = getFlagUrl(country);
+        const regionImage = (window.REGION_FLAG_IMAGES || {})[country];
+        flagImage.src = regionImage ? regionImage.src : getFlagUrl(country);
+        if (regionImage && regionImage.srcset) {
+            flagImage.srcset = regionImage.srcset;
+            flagImage.sizes = '60px';
+        }
         flagImage.alt = country;
         flagImageContainer.appendChild(flagImage);
 
@@ -645,7 +826,9 @@ function filterData() {
         });
     });
 
-    globalData.rankings = calculateRankings(filteredData, tableSortOption);
+    // Ranks are among the selected countries and year types: the server's only fit a full selection
+    globalData.rankings = (selectionCoversAllData() && serverRankings[tableSortOption])
+        || calculateRankings(filteredData, tableSortOption);
 
     // Update visualizations
     updateRadarChart(selectedGroup, mostRecentSelection);
@@ -2952,4 +3135,5 @@ document.getElementById('sortCountryButton').addEventListener('click', function(
 fetchData().then(() => {
     highlightSelectedButton(document.querySelector(`[data-category="Vision"]`)); // Automatically highlight Vision button
     filterData(); // Filter data based on Vision
+    subscribeToScorecardChanges();
 });
\ No newline at end of file
@@ -10,10 +10,15 @@ let appliedFilters = {
 
 async function loadIndicators() {
     try {
-        const response = await fetch('/api/scorecard_indicators');
+        const response = await fetch('/api/scorecard_indicators?format=normalized');
         if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
 
-        const indicators = await response.json();
+        // Indicator details arrive once per indicator; attach a copy to each value row
+        const payload = await response.json();
+        const indicators = (payload.values || []).map(value => ({
+            ...value,
+            Indicator_Details: payload.indicators[value.ID] ? { ...payload.indicators[value.ID] } : null
+        }));
         if (!Array.isArray(indicators)) throw new Error('The fetched data is not an array. Check the API response structure.');
 
         indicators.forEach(indicator => {
@@ -615,8 +620,8 @@ async function saveSurveyData(rowId, indicatorId, yearType, country, year) {
                 body: JSON.stringify(indicatorData),
             });
 
-            const result = await response.json();
-            if (response.ok) {
+            const result = await waitForSave(response, await response.json());
+            if (response.ok && !result.error) {
                 alert(result.message || 'Indicator data saved successfully!');
                 window.location.reload();  // Reload the page after a successful save
             } else {
@@ -659,8 +664,8 @@ async function saveSurveyData(rowId, indicatorId, yearType, country, year) {
                 body: JSON.stringify(scorecardData),
             });
 
-            const result = await response.json();
-            if (response.ok) {
+            const result = await waitForSave(response, await response.json());
+            if (response.ok && !result.error) {
                 alert(result.message || 'Scorecard data saved successfully!');
                 window.location.reload();  // Reload the page after a successful save
             } else {
@@ -673,6 +678,25 @@ async function saveSurveyData(rowId, indicatorId, yearType, country, year) {
     }
 }
 
+// In write-behind mode a save is acknowledged with 202 and a ticket; poll until it is committed
+async function waitForSave(response, result) {
+    if (response.status !== 202 || !result.ticket) {
+        return result;
+    }
+    for (let attempt = 0; attempt < 60; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 500));
+        const statusResponse = await fetch(`/api/save_status/${result.ticket}`);
+        const status = await statusResponse.json();
+        if (status.status === 'saved') {
+            return { message: result.message.replace('queued', 'saved') };
+        }
+        if (status.status === 'failed' || !statusResponse.ok) {
+            return { error: status.error || 'Save failed.' };
+        }
+    }
+    return { error: 'Save is still pending; check again before reloading.' };
+}
+
 // Function to show the form for adding a new indicator
 function showNewIndicatorForm() {
     const container = document.getElementById('newEntryContainer');
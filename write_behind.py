@@ -0,0 +1,217 @@
+import atexit
+import logging
+import threading
+import time
+import uuid
+
+from sqlalchemy import delete, insert, select
+
+from Classes.WriteTicket import WriteTicket
+from db import Session, use_primary
+
+INDICATOR = 'indicator'
+SCORECARD = 'scorecard'
+
+
+class WriteBehindQueue:
+    """
+    Acknowledge validated saves immediately and commit them in groups.
+
+    ``enqueue()`` returns a ticket ID right away. A background thread wakes every
+    ``flush_interval`` seconds (or as soon as ``max_batch`` saves are waiting),
+    keeps only the latest values for each indicator ``id`` / scorecard
+    ``secondary_id``, and writes everything waiting in one transaction through
+    ``writer(session, indicators, scorecards)``. The writer returns the secondary
+    IDs assigned to new scorecard rows (in order) and a callable that runs the
+    post-save work once the group has committed. If the group transaction fails,
+    each save is retried on its own so one bad row does not fail the others.
+
+    Ticket outcomes are written to ``write_tickets`` in the same transaction, so
+    a status poll served by another worker sees them too.
+    """
+
+    def __init__(self, writer, flush_interval, max_batch, ticket_ttl):
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.ticket_ttl = ticket_ttl
+        self._pending = {INDICATOR: {}, SCORECARD: {}}  # kind -> key -> (values, [ticket IDs])
+        self._pending_count = 0
+        self._tickets = {}  # ticket ID -> status dict, for tickets issued by this worker
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One group commit at a time
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopping = False
+        self.flushed_groups = 0
+        self.coalesced = 0
+
+    def enqueue(self, kind, values):
+        """Queue validated ``values`` for ``kind`` (INDICATOR or SCORECARD); returns the ticket ID."""
+        # The issue time is part of the ID so unknown tickets can be told apart from expired ones
+        ticket = f"{int(time.time())}-{uuid.uuid4().hex}"
+        key = values['id'] if kind == INDICATOR else values['secondary_id']
+        if key is None:
+            key = ticket  # New rows have nothing to coalesce with
+        with self._lock:
+            self._tickets[ticket] = {'status': 'queued', 'queued_at': time.time()}
+            entry = self._pending[kind].get(key)
+            if entry is None:
+                self._pending[kind][key] = (values, [ticket])
+                self._pending_count += 1
+            else:
+                # A later edit of the same row replaces the earlier one; both tickets complete together
+                self._pending[kind][key] = (values, entry[1] + [ticket])
+                self.coalesced += 1
+            if self._thread is None:
+                self._start()
+            if self._pending_count >= self.max_batch:
+                self._wake.set()
+        return ticket
+
+    def status(self, ticket):
+        """The ticket's status dict, or ``None`` for a ticket this app never issued (or forgot)."""
+        with self._lock:
+            local = self._tickets.get(ticket)
+        if local is not None:
+            return dict(local, ticket=ticket)
+
+        session = Session()
+        try:
+            row = session.execute(select(WriteTicket.__table__).where(WriteTicket.__table__.c.id == ticket)).first()
+        finally:
+            session.close()
+        if row is not None:
+            result = {'ticket': ticket, 'status': row.status}
+            if row.error:
+                result['error'] = row.error
+            if row.secondary_id is not None:
+                result['secondary_id'] = row.secondary_id
+            return result
+
+        # Issued by another worker that has not flushed it yet
+        try:
+            issued_at = int(ticket.split('-', 1)[0])
+        except ValueError:
+            return None
+        if time.time() - issued_at < self.ticket_ttl:
+            return {'ticket': ticket, 'status': 'pending'}
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'pending': self._pending_count,
+                'tickets': len(self._tickets),
+                'flushed_groups': self.flushed_groups,
+                'coalesced': self.coalesced,
+            }
+
+    def _start(self):
+        # Started by the first save, so each gunicorn worker runs its own thread after forking
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Error flushing write-behind queue: {e}")
+
+    def stop(self):
+        """Flush what is left and stop the background thread."""
+        self._stopping = True
+        self._wake.set()
+        self.flush()
+
+    def flush(self):
+        """Commit everything waiting as one group. Returns the number of saves written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {INDICATOR: {}, SCORECARD: {}}
+                self._pending_count = 0
+                self._prune_tickets()
+            entries = [(kind, values, tickets) for kind in (INDICATOR, SCORECARD)
+                       for values, tickets in pending[kind].values()]
+            if not entries:
+                return 0
+            try:
+                self._commit(entries)
+            except Exception as e:
+                logging.error(f"Write-behind group of {len(entries)} failed, retrying one by one: {e}")
+                for entry in entries:
+                    try:
+                        self._commit([entry])
+                    except Exception as row_error:
+                        self._fail(entry[2], str(row_error))
+            return len(entries)
+
+    def _commit(self, entries):
+        indicators = [values for kind, values, _ in entries if kind == INDICATOR]
+        scorecards = [values for kind, values, _ in entries if kind == SCORECARD]
+        session = Session()
+        use_primary(session)  # The writer's lookups must see the primary, not a lagging replica
+        try:
+            new_ids, after_commit = self.writer(session, indicators, scorecards)
+            new_ids = iter(new_ids)
+            now = time.time()
+            outcomes = {}
+            for kind, values, tickets in entries:
+                secondary_id = None
+                if kind == SCORECARD:
+                    secondary_id = values['secondary_id'] if values['secondary_id'] is not None else next(new_ids)
+                for ticket in tickets:
+                    outcomes[ticket] = {'status': 'saved', 'secondary_id': secondary_id}
+            session.execute(insert(WriteTicket.__table__), [
+                {'id': ticket, 'status': 'saved', 'error': None, 'secondary_id': outcome['secondary_id'],
+                 'completed_at': now}
+                for ticket, outcome in outcomes.items()
+            ])
+            session.execute(delete(WriteTicket.__table__).where(WriteTicket.__table__.c.completed_at < now - self.ticket_ttl))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+            Session.remove()  # The flush thread has its own scoped session
+
+        self._complete(outcomes)
+        self.flushed_groups += 1
+        try:
+            after_commit()
+        except Exception as e:
+            logging.error(f"Error after write-behind commit: {e}")
+
+    def _fail(self, tickets, error):
+        logging.error(f"Write-behind save failed: {error}")
+        self._complete({ticket: {'status': 'failed', 'error': error} for ticket in tickets})
+        session = Session()
+        try:
+            session.execute(insert(WriteTicket.__table__), [
+                {'id': ticket, 'status': 'failed', 'error': error, 'completed_at': time.time()} for ticket in tickets
+            ])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logging.error(f"Error recording failed write-behind tickets: {e}")
+        finally:
+            session.close()
+            Session.remove()
+
+    def _complete(self, outcomes):
+        with self._lock:
+            for ticket, outcome in outcomes.items():
+                if ticket in self._tickets:
+                    self._tickets[ticket].update({key: value for key, value in outcome.items() if value is not None})
+
+    def _prune_tickets(self):
+        cutoff = time.time() - self.ticket_ttl
+        for ticket in [ticket for ticket, state in self._tickets.items()
+                       if state['status'] != 'queued' and state['queued_at'] < cutoff]:
+            del self._tickets[ticket]